@@ -0,0 +1,142 @@
+import csv
+import json
+from typing import IO, Iterator, List, Tuple
+from pydantic import ValidationError
+from sqlalchemy import select, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from .models.book import Book
+from .schemas.book import BookCreate, BookImportError, BookImportReport
+from .utils.search import book_index
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+def detect_format(filename: str) -> str:
+    return "ndjson" if filename.lower().endswith((".ndjson", ".jsonl")) else "csv"
+
+class _DecodedLines:
+    """The stream's lines as text, decoded one at a time so a line that isn't
+    UTF-8 is skipped and reported rather than failing the whole file."""
+
+    def __init__(self, stream: IO[bytes]):
+        self.stream = stream
+        self.line_num = 0
+        self.errors: List[Tuple[int, UnicodeDecodeError]] = []
+
+    def __iter__(self) -> Iterator[str]:
+        for self.line_num, raw in enumerate(self.stream, start=1):
+            try:
+                yield raw.decode("utf-8-sig" if self.line_num == 1 else "utf-8")
+            except UnicodeDecodeError as exc:
+                self.errors.append((self.line_num, exc))
+
+    def drain_errors(self) -> List[Tuple[int, UnicodeDecodeError]]:
+        errors, self.errors = self.errors, []
+        return errors
+
+def iter_records(stream: IO[bytes], fmt: str) -> Iterator[Tuple[int, object]]:
+    """Yield (row number, raw record) pairs without reading the whole file.
+
+    Rows that can't be decoded or parsed are yielded as the exception instead
+    of a record.
+    """
+    lines = _DecodedLines(stream)
+    if fmt == "csv":
+        for record in csv.DictReader(lines):
+            yield from lines.drain_errors()
+            yield lines.line_num, record
+        yield from lines.drain_errors()
+        return
+    for line in lines:
+        yield from lines.drain_errors()
+        if not line.strip():
+            continue
+        try:
+            yield lines.line_num, json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield lines.line_num, exc
+    yield from lines.drain_errors()
+
+def record_error(exc: Exception) -> str:
+    """Message for a row iter_records couldn't decode or parse."""
+    if isinstance(exc, UnicodeDecodeError):
+        return f"Not valid UTF-8: {exc.reason} at byte {exc.start}"
+    return f"Invalid JSON: {exc}"
+
+def _error(row: int, record, message: str) -> BookImportError:
+    isbn = record.get("isbn") if isinstance(record, dict) else None
+    return BookImportError(row=row, isbn=isbn, error=message)
+
+async def _insert_batch(db: AsyncSession, batch: List[Tuple[int, BookCreate]], report: BookImportReport):
+    # One lookup per batch for ISBNs that are already in the catalog
+    result = await db.execute(select(Book.isbn).where(Book.isbn.in_([book.isbn for _, book in batch])))
+    existing = set(result.scalars().all())
+
+    pending = []
+    for row, book in batch:
+        if book.isbn in existing:
+            report.errors.append(BookImportError(row=row, isbn=book.isbn, error="ISBN already exists"))
+        else:
+            pending.append((row, book))
+    if not pending:
+        return
+
+    await _write(db, pending, report)
+
+async def _write(db: AsyncSession, pending: List[Tuple[int, BookCreate]], report: BookImportReport):
+    try:
+        await db.execute(
+            insert(Book).values([
+                {**book.model_dump(), "available_copies": book.total_copies}
+                for _, book in pending
+            ])
+        )
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        if len(pending) > 1:
+            # Find the offending rows one at a time; the rest still go in
+            for item in pending:
+                await _write(db, [item], report)
+            return
+        # Another writer took this ISBN since the lookup in _insert_batch
+        row, book = pending[0]
+        report.errors.append(BookImportError(row=row, isbn=book.isbn, error="ISBN conflicts with a concurrent insert"))
+        return
+    report.inserted += len(pending)
+
+async def import_books(db: AsyncSession, stream: IO[bytes], fmt: str, batch_size: int = 1000) -> BookImportReport:
+    """Validate, dedupe and insert books from a CSV or NDJSON stream in batches.
+
+    Invalid rows and duplicate ISBNs are reported per row and skipped; every
+    batch is committed on its own so one bad row never aborts the import.
+    """
+    report = BookImportReport()
+    batch: List[Tuple[int, BookCreate]] = []
+    seen = set()
+    for row, record in iter_records(stream, fmt):
+        report.processed += 1
+        if isinstance(record, Exception):
+            report.errors.append(BookImportError(row=row, error=record_error(record)))
+            continue
+        try:
+            book = BookCreate.model_validate(record)
+        except ValidationError as exc:
+            message = "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors())
+            report.errors.append(_error(row, record, message))
+            continue
+        if book.isbn in seen:
+            report.errors.append(_error(row, record, "Duplicate ISBN in import file"))
+            continue
+        seen.add(book.isbn)
+        batch.append((row, book))
+        if len(batch) >= batch_size:
+            await _insert_batch(db, batch, report)
+            batch = []
+    if batch:
+        await _insert_batch(db, batch, report)
+
+    if report.inserted:
+        book_index.invalidate()
+    report.errors.sort(key=lambda error: error.row)
+    return report
@@ -1,15 +1,67 @@
+import asyncio
+import logging
+import math
+import time
+from fastapi import Request, Response
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base, sessionmaker
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import NullPool, AsyncAdaptedQueuePool
 from .config import settings
+from .utils.sql_metrics import instrument_engine
+
+class PoolStats:
+    """Running counters for connection checkouts from the engine pool."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_checkout(self, wait: float):
+        self.checkouts += 1
+        self.total_wait += wait
+        if wait > self.max_wait:
+            self.max_wait = wait
+
+pool_stats = PoolStats()
+
+logger = logging.getLogger(__name__)
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection."""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            pool_stats.record_checkout(time.perf_counter() - start)
+
+def _engine_options() -> dict:
+    options = {"echo": settings.DB_ECHO, "future": True}
+    if not settings.DB_USE_POOL:
+        options["poolclass"] = NullPool
+        return options
+    options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    return options
 
 # Create async engine
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=True,
-    future=True,
-    poolclass=NullPool
-)
+engine = create_async_engine(settings.DATABASE_URL, **_engine_options())
+
+if settings.SQL_METRICS:
+    instrument_engine(engine)
 
 # Create async session factory
 async_session = sessionmaker(
@@ -18,17 +70,134 @@ async_session = sessionmaker(
     expire_on_commit=False
 )
 
+# Optional read-only engine for side-effect-free endpoints
+read_engine = None
+read_session = None
+if settings.READ_REPLICA_URL:
+    read_options = _engine_options()
+    if settings.READ_REPLICA_URL.startswith("mysql"):
+        read_options["connect_args"] = {"connect_timeout": settings.READ_REPLICA_CONNECT_TIMEOUT}
+    read_engine = create_async_engine(settings.READ_REPLICA_URL, **read_options)
+    if settings.SQL_METRICS:
+        instrument_engine(read_engine)
+    read_session = sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+
+class ReplicaStatus:
+    """Whether reads currently go to the replica, and how often they fell back."""
+
+    def __init__(self):
+        self.down_until = 0.0
+        self.fallbacks = 0
+        self.last_error = None
+
+    def available(self) -> bool:
+        return read_session is not None and time.monotonic() >= self.down_until
+
+    def mark_down(self, exc: Exception):
+        self.down_until = time.monotonic() + settings.READ_REPLICA_RETRY_AFTER
+        self.fallbacks += 1
+        self.last_error = str(exc).splitlines()[0]
+        logger.warning("Read replica unreachable, reading from the primary: %s", self.last_error)
+
+replica_status = ReplicaStatus()
+
 # Create base class for models
 Base = declarative_base()
 
-# Dependency to get DB session
+def get_pool_status() -> dict:
+    pool = engine.sync_engine.pool
+    if not isinstance(pool, AsyncAdaptedQueuePool):
+        return {"pooled": False, "pool_class": type(pool).__name__}
+    checkouts = pool_stats.checkouts
+    return {
+        "pooled": True,
+        "pool_class": type(pool).__name__,
+        "pool_size": pool.size(),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "checkouts": checkouts,
+        "avg_checkout_wait_ms": round(pool_stats.total_wait / checkouts * 1000, 3) if checkouts else 0.0,
+        "max_checkout_wait_ms": round(pool_stats.max_wait * 1000, 3),
+    }
+
+async def warm_pool(target, connections: int):
+    """Open `connections` pooled connections so first requests skip the handshake."""
+    if connections <= 0 or not isinstance(target.sync_engine.pool, AsyncAdaptedQueuePool):
+        return
+    async def ping():
+        async with target.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    await asyncio.gather(*(ping() for _ in range(min(connections, settings.DB_POOL_SIZE))))
+
+def get_replica_status() -> dict:
+    return {
+        "configured": read_session is not None,
+        "available": replica_status.available(),
+        "retry_in_seconds": round(max(0.0, replica_status.down_until - time.monotonic()), 1),
+        "fallbacks": replica_status.fallbacks,
+        "last_error": replica_status.last_error,
+    }
+
+PRIMARY_READS_COOKIE = "read_primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+async def pin_reads_to_primary(request: Request, response: Response):
+    """Keep this client's reads on the primary for READ_REPLICA_STICKY_SECONDS
+    after a write, so it sees its own changes despite replica lag.
+
+    This runs before the handler, so the cookie goes on the sub-response
+    FastAPI merges into the handler's return value. A handler that raises
+    (HTTPException, validation, a failed commit) gets a fresh error
+    response without it, so only writes that return normally pin reads.
+    """
+    if read_session is not None and request.method not in SAFE_METHODS:
+        response.set_cookie(
+            PRIMARY_READS_COOKIE,
+            f"{time.time() + settings.READ_REPLICA_STICKY_SECONDS:.3f}",
+            max_age=math.ceil(settings.READ_REPLICA_STICKY_SECONDS),
+            httponly=True,
+            samesite="lax",
+        )
+
+def reads_pinned(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(PRIMARY_READS_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+async def open_read_session(prefer_primary: bool = False) -> AsyncSession:
+    """A session on the replica if it is configured and answering, else on the primary."""
+    if not prefer_primary and replica_status.available():
+        session = read_session()
+        try:
+            await session.connection()
+            return session
+        except (DBAPIError, OSError) as exc:
+            await session.close()
+            replica_status.mark_down(exc)
+    return async_session()
+
+# Dependency to get DB session. Handlers commit their own writes, so the
+# session is only rolled back here on error and otherwise just released.
 async def get_db():
     async with async_session() as session:
         try:
             yield session
-            await session.commit()
         except Exception:
             await session.rollback()
             raise
         finally:
-            await session.close() 
\ No newline at end of file
+            await session.close()
+
+# Dependency for side-effect-free endpoints; see open_read_session
+async def get_read_db(request: Request):
+    session = await open_read_session(prefer_primary=reads_pinned(request))
+    try:
+        yield session
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
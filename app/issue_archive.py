@@ -0,0 +1,79 @@
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import select, insert, delete, func, and_, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+from .config import settings
+from .models.book_issue import BookIssue, ArchivedBookIssue, IssueStatus
+
+logger = logging.getLogger(__name__)
+
+# Columns copied as they are; archived_at is stamped on the way over
+ARCHIVED_COLUMNS = [column.key for column in BookIssue.__table__.columns]
+
+@dataclass
+class ArchiveReport:
+    rows: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+def archivable(cutoff: datetime):
+    # Returned is final, so these rows never change again
+    return and_(BookIssue.status == IssueStatus.RETURNED, BookIssue.actual_return_date < cutoff)
+
+async def count_archivable(db: AsyncSession, older_than_days: Optional[int] = None) -> int:
+    cutoff = datetime.now() - timedelta(days=older_than_days or settings.ISSUE_ARCHIVE_AFTER_DAYS)
+    return (await db.execute(select(func.count(BookIssue.id)).where(archivable(cutoff)))).scalar_one()
+
+async def archive_returned_issues(
+    db: AsyncSession,
+    older_than_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    max_batches: Optional[int] = None,
+) -> ArchiveReport:
+    """Move issues returned more than `older_than_days` ago to book_issues_archive.
+
+    Walks book_issues in id order, copying and deleting one id range of at most
+    `batch_size` archivable rows per transaction, so locks and undo stay bounded
+    and an interrupted run just leaves the remaining rows for the next one.
+    """
+    older_than_days = older_than_days or settings.ISSUE_ARCHIVE_AFTER_DAYS
+    batch_size = batch_size or settings.ISSUE_ARCHIVE_BATCH_SIZE
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    report = ArchiveReport()
+    started = time.perf_counter()
+    last_id = 0
+    while max_batches is None or report.batches < max_batches:
+        batch = (
+            select(BookIssue.id)
+            .where(BookIssue.id > last_id, archivable(cutoff))
+            .order_by(BookIssue.id)
+            .limit(batch_size)
+            .subquery()
+        )
+        result = await db.execute(select(func.count(), func.max(batch.c.id)))
+        rows, upper = result.one()
+        if not rows:
+            break
+        # The range bounds the INSERT ... SELECT and DELETE without an id list
+        in_batch = and_(BookIssue.id.between(last_id + 1, upper), archivable(cutoff))
+        now = datetime.now()
+        await db.execute(
+            insert(ArchivedBookIssue).from_select(
+                ARCHIVED_COLUMNS + ["archived_at"],
+                select(*[getattr(BookIssue, key) for key in ARCHIVED_COLUMNS], literal(now)).where(in_batch),
+            )
+        )
+        await db.execute(delete(BookIssue).where(in_batch).execution_options(synchronize_session=False))
+        await db.commit()
+        report.rows += rows
+        report.batches += 1
+        last_id = upper
+        if rows < batch_size:
+            break
+    report.seconds = time.perf_counter() - started
+    if report.rows:
+        logger.info("Archived %d returned issues in %d batches", report.rows, report.batches)
+    return report
@@ -1,9 +1,13 @@
-from fastapi import FastAPI
+import asyncio
+import contextlib
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import books, students, book_issues, conversation
+from .routers import books, students, book_issues, conversation, internal
 from .config import settings
-from .database import engine, Base
-from .models import book, student, book_issue
+from .database import engine, read_engine, pin_reads_to_primary, warm_pool
+from .migrations import check_schema, migrate
+from .utils.sql_metrics import SQLMetricsMiddleware
+from .overdue_sweeper import run_sweeper
 
 app = FastAPI(
     title="Library Management System",
@@ -18,18 +22,55 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Intent", "X-Intent-Confidence"],
 )
 
+if settings.SQL_METRICS:
+    app.add_middleware(SQLMetricsMiddleware, n_plus_one_threshold=settings.SQL_N_PLUS_ONE_THRESHOLD)
+
 # Include routers
-app.include_router(books.router, prefix="/api/v1/books", tags=["books"])
-app.include_router(students.router, prefix="/api/v1/students", tags=["students"])
-app.include_router(book_issues.router, prefix="/api/v1/issues", tags=["book_issues"])
+# Writes through these routers pin the client's reads to the primary
+write_dependencies = [Depends(pin_reads_to_primary)]
+app.include_router(books.router, prefix="/api/v1/books", tags=["books"], dependencies=write_dependencies)
+app.include_router(students.router, prefix="/api/v1/students", tags=["students"], dependencies=write_dependencies)
+app.include_router(book_issues.router, prefix="/api/v1/issues", tags=["book_issues"], dependencies=write_dependencies)
 app.include_router(conversation.router, prefix="/api/v1/chat", tags=["conversation"])
+app.include_router(internal.router, prefix="/api/v1/internal", tags=["internal"])
 
 @app.on_event("startup")
 async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # DDL lives in migrate.py; workers only compare the stored version
+    try:
+        if settings.DB_SCHEMA_ON_STARTUP == "migrate":
+            await migrate(engine)
+        elif settings.DB_SCHEMA_ON_STARTUP == "check":
+            await check_schema(engine)
+    except Exception:
+        # Shutdown hooks don't run after a failed startup
+        await engine.dispose()
+        raise
+    await warm_pool(engine, settings.DB_POOL_WARMUP)
+    if read_engine is not None:
+        await warm_pool(read_engine, settings.DB_POOL_WARMUP)
+
+@app.on_event("startup")
+async def start_overdue_sweeper():
+    if settings.OVERDUE_SWEEP_INTERVAL > 0:
+        app.state.overdue_sweeper = asyncio.create_task(run_sweeper(settings.OVERDUE_SWEEP_INTERVAL))
+
+@app.on_event("shutdown")
+async def stop_overdue_sweeper():
+    task = getattr(app.state, "overdue_sweeper", None)
+    if task:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+@app.on_event("shutdown")
+async def close_db():
+    await engine.dispose()
+    if read_engine is not None:
+        await read_engine.dispose()
 
 @app.get("/")
 async def root():
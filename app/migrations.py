@@ -0,0 +1,87 @@
+import logging
+from datetime import datetime
+from typing import List, Tuple
+from sqlalchemy import inspect, select, func, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from .database import Base
+from .models import book, student, book_issue, borrow_stats
+from .models.schema_version import SchemaVersion
+
+logger = logging.getLogger(__name__)
+
+# Bump together with a new entry in MIGRATIONS whenever the models change
+SCHEMA_VERSION = 4
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+def _create_tables(conn):
+    Base.metadata.create_all(conn)
+
+def _add_borrow_counters(conn):
+    inspector = inspect(conn)
+    for table in (book.Book.__table__, student.Student.__table__):
+        if "borrow_count" in {column["name"] for column in inspector.get_columns(table.name)}:
+            continue
+        conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN borrow_count INTEGER NOT NULL DEFAULT 0"))
+
+def _create_missing_indexes(conn):
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(conn, checkfirst=True)
+
+# (version, description, step); every step is idempotent so a database that
+# predates versioning can be brought up by running all of them
+MIGRATIONS = [
+    (1, "Create tables", _create_tables),
+    (2, "Add borrow counters to books and students", _add_borrow_counters),
+    (3, "Add book_issues composite indexes, books.created_at and FULLTEXT indexes", _create_missing_indexes),
+    (4, "Add the book_issues_archive table", _create_tables),
+]
+
+def _current_version(conn) -> int:
+    try:
+        return conn.execute(select(func.max(SchemaVersion.version))).scalar() or 0
+    except DBAPIError:
+        # No schema_version table yet
+        conn.rollback()
+        return 0
+
+async def get_schema_version(engine: AsyncEngine) -> int:
+    async with engine.connect() as conn:
+        return await conn.run_sync(_current_version)
+
+async def check_schema(engine: AsyncEngine) -> int:
+    """Fail fast if migrations are pending; one query, no introspection.
+
+    A database ahead of SCHEMA_VERSION is accepted: during a rolling deploy
+    the new release migrates first while old workers are still starting.
+    """
+    version = await get_schema_version(engine)
+    if version < SCHEMA_VERSION:
+        raise SchemaOutOfDate(
+            f"Database schema is at version {version}, the app expects {SCHEMA_VERSION}; "
+            "run `python migrate.py`"
+        )
+    return version
+
+def _apply(conn, pending: List[Tuple[int, str, object]]):
+    for version, description, step in pending:
+        logger.info("Applying schema migration %d: %s", version, description)
+        step(conn)
+        conn.execute(SchemaVersion.__table__.insert().values(
+            version=version, description=description, applied_at=datetime.now()
+        ))
+
+async def migrate(engine: AsyncEngine) -> Tuple[int, int]:
+    """Apply pending migrations; returns the (old, new) schema version."""
+    current = await get_schema_version(engine)
+    pending = [migration for migration in MIGRATIONS if migration[0] > current]
+    if pending:
+        async with engine.begin() as conn:
+            await conn.run_sync(_apply, pending)
+    return current, max([current] + [version for version, _, _ in pending])
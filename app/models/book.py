@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, func
+from sqlalchemy import Column, Integer, String, DateTime, Index, func
 from ..database import Base
 
 class Book(Base):
@@ -11,5 +11,15 @@ class Book(Base):
     total_copies = Column(Integer, nullable=False)
     available_copies = Column(Integer, nullable=False)
     category = Column(String(100), nullable=False, index=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now()) 
\ No newline at end of file
+    borrow_count = Column(Integer, nullable=False, default=0, server_default="0", index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ft_books_catalog", "title", "author", "category", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+    )
+
+    # created_at/updated_at come from the database clock and are fetched in
+    # the flush (RETURNING where supported), so responses need no refresh.
+    # New rows pass updated_at=None so the INSERT has nothing else to fetch.
+    __mapper_args__ = {"eager_defaults": True}
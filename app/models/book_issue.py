@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, func, Enum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, func, Enum
 from sqlalchemy.orm import relationship
 import enum
 from ..database import Base
@@ -8,6 +8,9 @@ class IssueStatus(str, enum.Enum):
     RETURNED = "returned"
     OVERDUE = "overdue"
 
+# Statuses of issues whose book is still out; OVERDUE is set by the overdue sweeper
+ACTIVE_STATUSES = (IssueStatus.ISSUED, IssueStatus.OVERDUE)
+
 class BookIssue(Base):
     __tablename__ = "book_issues"
 
@@ -23,4 +26,41 @@ class BookIssue(Base):
 
     # Relationships
     book = relationship("Book", backref="issues")
-    student = relationship("Student", backref="issues") 
\ No newline at end of file
+    student = relationship("Student", backref="issues")
+
+    # Overdue sweeps and active/overdue listings; a student's open issues and
+    # history; the duplicate-issue check in issue_book. The last two also
+    # serve the student_id and book_id foreign keys.
+    __table_args__ = (
+        Index("ix_book_issues_status_return_date", "status", "return_date"),
+        Index("ix_book_issues_student_status_return_date", "student_id", "status", "return_date"),
+        Index("ix_book_issues_book_student_status", "book_id", "student_id", "status"),
+    )
+
+    # created_at/updated_at come from the database clock and are fetched in
+    # the flush (RETURNING where supported), so responses need no refresh.
+    # New rows pass updated_at=None so the INSERT has nothing else to fetch.
+    __mapper_args__ = {"eager_defaults": True}
+
+class ArchivedBookIssue(Base):
+    """Returned issues moved out of book_issues by the archiver, ids unchanged."""
+    __tablename__ = "book_issues_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    book_id = Column(Integer, ForeignKey("books.id"), nullable=False, index=True)
+    student_id = Column(Integer, ForeignKey("students.id"), nullable=False)
+    issue_date = Column(DateTime(timezone=True), nullable=False)
+    return_date = Column(DateTime(timezone=True), nullable=False)
+    actual_return_date = Column(DateTime(timezone=True), nullable=True)
+    status = Column(Enum(IssueStatus), nullable=False)
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+    archived_at = Column(DateTime(timezone=True), nullable=False)
+
+    book = relationship("Book")
+    student = relationship("Student")
+
+    # A student's history, newest first
+    __table_args__ = (
+        Index("ix_book_issues_archive_student_created_at", "student_id", "created_at"),
+    )
@@ -0,0 +1,8 @@
+from sqlalchemy import Column, Integer, String
+from ..database import Base
+
+class DepartmentBorrowCount(Base):
+    __tablename__ = "department_borrow_counts"
+
+    department = Column(String(100), primary_key=True)
+    borrow_count = Column(Integer, nullable=False, default=0, server_default="0", index=True)
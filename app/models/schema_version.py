@@ -0,0 +1,9 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from ..database import Base
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True)
+    description = Column(String(255), nullable=False)
+    applied_at = Column(DateTime(timezone=True), nullable=False)
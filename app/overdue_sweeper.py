@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import select, update, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from .config import settings
+from .database import async_session
+from .models.book_issue import BookIssue, IssueStatus
+from .utils.cache import invalidate_chat
+
+logger = logging.getLogger(__name__)
+
+class SweepStats:
+    """Counters for overdue sweeps, reported on the internal stats endpoint."""
+
+    def __init__(self):
+        self.runs = 0
+        self.failures = 0
+        self.rows_total = 0
+        self.last_rows = 0
+        self.last_duration_ms = 0.0
+        self.max_duration_ms = 0.0
+        self.last_run_at: Optional[datetime] = None
+
+    def record(self, rows: int, duration: float):
+        self.runs += 1
+        self.rows_total += rows
+        self.last_rows = rows
+        self.last_duration_ms = round(duration * 1000, 3)
+        self.max_duration_ms = max(self.max_duration_ms, self.last_duration_ms)
+        self.last_run_at = datetime.now()
+
+    def as_dict(self) -> dict:
+        return {
+            "interval_seconds": settings.OVERDUE_SWEEP_INTERVAL,
+            "batch_size": settings.OVERDUE_SWEEP_BATCH_SIZE,
+            "runs": self.runs,
+            "failures": self.failures,
+            "rows_total": self.rows_total,
+            "last_rows": self.last_rows,
+            "last_duration_ms": self.last_duration_ms,
+            "max_duration_ms": self.max_duration_ms,
+            "last_run_at": self.last_run_at,
+        }
+
+sweep_stats = SweepStats()
+
+async def sweep_overdue(db: AsyncSession, batch_size: Optional[int] = None) -> int:
+    """Flip issued books past their return date to OVERDUE, one bounded batch per transaction."""
+    batch_size = batch_size or settings.OVERDUE_SWEEP_BATCH_SIZE
+    now = datetime.now()
+    started = time.perf_counter()
+    touched = 0
+    while True:
+        # Walks the (status, return_date) index from the oldest due date
+        result = await db.execute(
+            select(BookIssue.id)
+            .where(and_(BookIssue.status == IssueStatus.ISSUED, BookIssue.return_date < now))
+            .order_by(BookIssue.return_date)
+            .limit(batch_size)
+        )
+        ids = result.scalars().all()
+        if not ids:
+            break
+        # Re-check the status so an issue returned meanwhile is left alone
+        result = await db.execute(
+            update(BookIssue)
+            .where(and_(BookIssue.id.in_(ids), BookIssue.status == IssueStatus.ISSUED))
+            .values(status=IssueStatus.OVERDUE)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        touched += result.rowcount
+        if len(ids) < batch_size:
+            break
+    sweep_stats.record(touched, time.perf_counter() - started)
+    if touched:
+        invalidate_chat("issues_overdue")
+    return touched
+
+async def run_sweeper(interval: float):
+    """Sweep forever on a fixed interval; started from the app lifespan."""
+    while True:
+        try:
+            async with async_session() as session:
+                rows = await sweep_overdue(session)
+            if rows:
+                logger.info("Overdue sweep marked %d issues overdue", rows)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            sweep_stats.failures += 1
+            logger.exception("Overdue sweep failed")
+        await asyncio.sleep(interval)
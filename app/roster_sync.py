@@ -0,0 +1,216 @@
+from collections import Counter
+from dataclasses import dataclass
+from typing import IO, Dict, List, Optional
+from pydantic import ValidationError
+from sqlalchemy import select, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from .book_import import iter_records, record_error
+from .models.student import Student
+from .schemas.student import StudentCreate, RosterSyncError, RosterSyncReport
+from .utils.search import student_index
+from .utils.counters import move_department_borrows
+from .utils.catalog_cache import student_cache
+from .utils.cache import invalidate_chat
+
+# Columns the roster owns; roll_number identifies the student
+SYNCED_FIELDS = ("name", "department", "semester", "phone", "email")
+UNIQUE_FIELDS = ("phone", "email")
+
+@dataclass
+class _Existing:
+    id: int
+    name: str
+    department: str
+    semester: int
+    phone: str
+    email: str
+    borrow_count: int
+
+@dataclass
+class _Change:
+    row: int
+    student: StudentCreate
+    existing: Optional[_Existing]
+
+def _matches(record: dict, current: _Existing) -> bool:
+    return all(str(record.get(field)) == str(getattr(current, field)) for field in SYNCED_FIELDS)
+
+def _parse(stream: IO[bytes], fmt: str, existing: Dict[str, _Existing], report: RosterSyncReport) -> List[_Change]:
+    """Diff roster rows against `existing`, returning validated new and changed students.
+
+    Rows identical to the stored student are counted as unchanged without
+    validation (the stored values already passed it, and email validation
+    is most of the cost). Rows repeating a key seen earlier in the file are
+    reported and dropped.
+    """
+    changes: List[_Change] = []
+    seen = {"roll_number": set(), "phone": set(), "email": set()}
+    for row, record in iter_records(stream, fmt):
+        report.processed += 1
+        if isinstance(record, Exception):
+            report.errors.append(RosterSyncError(row=row, error=record_error(record)))
+            continue
+        roll_number = record.get("roll_number") if isinstance(record, dict) else None
+        current = existing.get(roll_number) if isinstance(roll_number, str) else None
+        if (
+            current is not None and _matches(record, current) and roll_number not in seen["roll_number"]
+            and current.phone not in seen["phone"] and current.email not in seen["email"]
+        ):
+            seen["roll_number"].add(roll_number)
+            seen["phone"].add(current.phone)
+            seen["email"].add(current.email)
+            report.unchanged += 1
+            continue
+        try:
+            student = StudentCreate.model_validate(record)
+        except ValidationError as exc:
+            message = "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors())
+            report.errors.append(RosterSyncError(row=row, roll_number=roll_number, error=message))
+            continue
+        repeated = [field for field in seen if getattr(student, field) in seen[field]]
+        if repeated:
+            report.errors.append(RosterSyncError(
+                row=row, roll_number=student.roll_number, error=f"Duplicate {', '.join(repeated)} in roster"
+            ))
+            continue
+        for field in seen:
+            seen[field].add(getattr(student, field))
+        change = _Change(row, student, existing.get(student.roll_number))
+        if change.existing is not None and _unchanged(change):
+            report.unchanged += 1
+        else:
+            changes.append(change)
+    return changes
+
+async def _load_existing(db: AsyncSession) -> Dict[str, _Existing]:
+    result = await db.stream(
+        select(Student.roll_number, Student.id, *[getattr(Student, f) for f in SYNCED_FIELDS], Student.borrow_count)
+        .execution_options(yield_per=5000)
+    )
+    return {roll_number: _Existing(*values) async for roll_number, *values in result}
+
+def _unchanged(change: _Change) -> bool:
+    return all(getattr(change.student, field) == getattr(change.existing, field) for field in SYNCED_FIELDS)
+
+def _drop_conflicts(changes: List[_Change], existing: Dict[str, _Existing], report: RosterSyncReport) -> List[_Change]:
+    """Drop changes that would leave a phone or email on two students.
+
+    Works on the final state, so students swapping or handing over a phone
+    number within the same roster are fine. Dropping a change puts its old
+    values back, which can expose another conflict, so repeat until stable.
+    """
+    while True:
+        changed = {change.student.roll_number: change for change in changes}
+        conflicts = {}
+        for field in UNIQUE_FIELDS:
+            owners: Dict[str, List[str]] = {}
+            for roll_number, student in existing.items():
+                if roll_number not in changed:
+                    owners.setdefault(getattr(student, field), []).append(roll_number)
+            for roll_number, change in changed.items():
+                owners.setdefault(getattr(change.student, field), []).append(roll_number)
+            for value, rolls in owners.items():
+                if len(rolls) < 2:
+                    continue
+                for roll_number in rolls:
+                    if roll_number in changed:
+                        others = ", ".join(other for other in rolls if other != roll_number)
+                        conflicts.setdefault(roll_number, f"{field} {value} also belongs to roll number {others}")
+        if not conflicts:
+            return changes
+        for change in changes:
+            roll_number = change.student.roll_number
+            if roll_number in conflicts:
+                report.errors.append(RosterSyncError(row=change.row, roll_number=roll_number, error=conflicts[roll_number]))
+        changes = [change for change in changes if change.student.roll_number not in conflicts]
+
+async def _write(db: AsyncSession, batch: List[_Change]):
+    # Timestamps come from the database clock, as for rows written through the ORM
+    inserts = [c.student.model_dump() for c in batch if c.existing is None]
+    updates = [
+        {"id": c.existing.id, **c.student.model_dump(include=set(SYNCED_FIELDS))}
+        for c in batch if c.existing is not None
+    ]
+    # Students who change department take their borrows with them, as in update_student
+    moves = Counter()
+    for c in batch:
+        if c.existing is not None and c.existing.department != c.student.department:
+            moves[(c.existing.department, c.student.department)] += c.existing.borrow_count
+    # Park changing phones/emails on placeholders first, so students swapping
+    # them within the batch don't collide halfway through
+    rekeyed = [
+        {"id": c.existing.id, **{field: f"~{c.existing.id}" for field in UNIQUE_FIELDS}}
+        for c in batch
+        if c.existing is not None and any(getattr(c.existing, f) != getattr(c.student, f) for f in UNIQUE_FIELDS)
+    ]
+    if rekeyed:
+        await db.execute(update(Student), rekeyed)
+    if updates:
+        await db.execute(update(Student), updates)
+    if inserts:
+        await db.execute(insert(Student), inserts)
+    for (old, new), count in moves.items():
+        await move_department_borrows(db, old, new, count)
+    await db.commit()
+
+async def _apply_batch(db: AsyncSession, batch: List[_Change], report: RosterSyncReport):
+    try:
+        await _write(db, batch)
+    except IntegrityError:
+        await db.rollback()
+        if len(batch) > 1:
+            # Find the offending rows one at a time; the rest still go in
+            for change in batch:
+                await _apply_batch(db, [change], report)
+            return
+        # Another writer took the key since the roster was diffed, or it is
+        # still held by a student whose change lands in a later batch
+        change = batch[0]
+        report.errors.append(RosterSyncError(
+            row=change.row, roll_number=change.student.roll_number,
+            error="Conflicts with another student's phone or email"
+        ))
+        return
+    report.inserted += sum(1 for change in batch if change.existing is None)
+    report.updated += sum(1 for change in batch if change.existing is not None)
+
+async def sync_roster(
+    db: AsyncSession, stream: IO[bytes], fmt: str, batch_size: int = 1000, dry_run: bool = False
+) -> RosterSyncReport:
+    """Bring `students` in line with a full roster (CSV or NDJSON, keyed by roll_number).
+
+    The roster is diffed against the table in memory and only new and changed
+    students are written, in batches of executemany INSERTs and UPDATEs, each
+    committed on its own. Invalid rows and phone/email conflicts are reported
+    per row and skipped. Students missing from the roster are counted, never
+    deleted.
+    """
+    report = RosterSyncReport(dry_run=dry_run)
+    existing = await _load_existing(db)
+    # Matching is by roll number, so a row either updates or inserts
+    pending = _parse(stream, fmt, existing, report)
+    listed = report.unchanged + sum(1 for change in pending if change.existing is not None)
+    report.not_in_roster = len(existing) - listed
+    pending = _drop_conflicts(pending, existing, report)
+    # Students taking over a phone or email someone else is giving up go last,
+    # after the batch that frees it
+    taken = {getattr(student, field) for student in existing.values() for field in UNIQUE_FIELDS}
+    pending.sort(key=lambda change: any(
+        getattr(change.student, field) in taken
+        and (change.existing is None or getattr(change.existing, field) != getattr(change.student, field))
+        for field in UNIQUE_FIELDS
+    ))
+
+    if dry_run:
+        report.inserted = sum(1 for change in pending if change.existing is None)
+        report.updated = len(pending) - report.inserted
+    else:
+        for start in range(0, len(pending), batch_size):
+            await _apply_batch(db, pending[start:start + batch_size], report)
+        if report.inserted or report.updated:
+            student_index.invalidate()
+            student_cache.clear()
+            invalidate_chat("student_changed")
+    report.errors.sort(key=lambda error: error.row)
+    return report
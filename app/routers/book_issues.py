@@ -1,76 +1,269 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_
-from sqlalchemy.orm import selectinload
-from typing import List
+from sqlalchemy import select, update, and_, or_
+from sqlalchemy.orm import joinedload, selectinload
+from typing import List, Optional
 from datetime import datetime, timedelta
-from ..database import get_db
+from heapq import merge
+from ..database import get_db, get_read_db
 from ..models.book import Book
 from ..models.student import Student
-from ..models.book_issue import BookIssue, IssueStatus
-from ..schemas.book_issue import BookIssueCreate, BookIssueResponse
+from ..models.book_issue import BookIssue, ArchivedBookIssue, IssueStatus, ACTIVE_STATUSES
+from ..schemas.book_issue import (
+    BookIssueCreate, BookIssueResponse, BookIssueBatchCreate, BookIssueBatchReturn,
+    BookIssueBatchFailure, BookIssueBatchResponse, ISSUE_COMPACT_FIELDS, ISSUE_NESTED_FIELDS
+)
+from ..utils.pagination import keyset_paginate, set_next_cursor
+from ..utils.serialization import fast_response
+from ..utils.fields import FIELDS_QUERY, VIEW_QUERY, resolve_fields, sparse_columns, sparse_response
+from ..utils.counters import record_borrows
+from ..utils.cache import invalidate_chat
+from ..utils import catalog_cache
 
 router = APIRouter(prefix="/issues", tags=["book-issues"])
 
+def resolve_issue_fields(fields: Optional[str], view: Optional[str]) -> Optional[List[str]]:
+    return resolve_fields(fields, view, list(BookIssueResponse.model_fields), ISSUE_COMPACT_FIELDS)
+
+def issue_listing_query(selected: Optional[List[str]], sort_key=(), model=BookIssue):
+    """SELECT for an issue listing: only the requested columns, and only the
+    relationships that were asked for. `model` may be ArchivedBookIssue."""
+    if selected is None:
+        return select(model).options(selectinload(model.book), selectinload(model.student))
+    nested = [field for field in selected if field in ISSUE_NESTED_FIELDS]
+    if nested:
+        return select(model).options(*[selectinload(getattr(model, field)) for field in nested])
+    return select(*sparse_columns(model, selected, sort_key))
+
+async def fetch_issue_listing(db: AsyncSession, query, selected: Optional[List[str]]):
+    result = await db.execute(query)
+    if selected is None or any(field in ISSUE_NESTED_FIELDS for field in selected):
+        return result.scalars().all()
+    return result.all()
+
+def issue_listing_response(issues, selected: Optional[List[str]], response: Optional[Response] = None):
+    if selected is None:
+        return fast_response(issues, BookIssueResponse, response)
+    return sparse_response(issues, selected, response, ISSUE_NESTED_FIELDS)
+
 @router.post("/", response_model=BookIssueResponse)
 async def issue_book(issue: BookIssueCreate, db: AsyncSession = Depends(get_db)):
-    # Check if book exists and has available copies
-    result = await db.execute(select(Book).where(Book.id == issue.book_id))
-    book = result.scalar_one_or_none()
-    if not book:
-        raise HTTPException(status_code=404, detail="Book not found")
-    if book.available_copies <= 0:
-        raise HTTPException(status_code=400, detail="No copies available for this book")
-    
-    # Check if student exists
-    result = await db.execute(select(Student).where(Student.id == issue.student_id))
-    student = result.scalar_one_or_none()
-    if not student:
-        raise HTTPException(status_code=404, detail="Student not found")
-    
-    # Check if student already has this book issued
-    result = await db.execute(
-        select(BookIssue).where(
+    # Check the student exists and doesn't already hold this book in one query.
+    # Locking the student row serializes that student's concurrent checkouts.
+    already_issued = (
+        select(BookIssue.id)
+        .where(
             and_(
                 BookIssue.book_id == issue.book_id,
-                BookIssue.student_id == issue.student_id,
-                BookIssue.status == IssueStatus.ISSUED
+                BookIssue.student_id == Student.id,
+                BookIssue.status.in_(ACTIVE_STATUSES)
             )
         )
+        .exists()
     )
-    if result.scalar_one_or_none():
+    result = await db.execute(
+        select(Student, already_issued.label("already_issued"))
+        .where(Student.id == issue.student_id)
+        .with_for_update(of=Student)
+    )
+    row = result.one_or_none()
+    if not row:
+        raise HTTPException(status_code=404, detail="Student not found")
+    student, has_book = row
+    if has_book:
         raise HTTPException(
             status_code=400,
             detail="Student already has this book issued"
         )
     
+    # Take a copy atomically; no rows updated means missing or none left
+    result = await db.execute(
+        update(Book)
+        .where(and_(Book.id == issue.book_id, Book.available_copies > 0))
+        .values(
+            available_copies=Book.available_copies - 1,
+            borrow_count=Book.borrow_count + 1
+        )
+        .execution_options(synchronize_session=False)
+    )
+    copy_taken = result.rowcount == 1
+    result = await db.execute(
+        select(Book).where(Book.id == issue.book_id).execution_options(populate_existing=True)
+    )
+    book = result.scalar_one_or_none()
+    if not book:
+        raise HTTPException(status_code=404, detail="Book not found")
+    if not copy_taken:
+        raise HTTPException(status_code=400, detail="No copies available for this book")
+    
     # Create book issue
     db_issue = BookIssue(
         book_id=issue.book_id,
         student_id=issue.student_id,
         issue_date=issue.issue_date,
         return_date=issue.return_date,
-        status=IssueStatus.ISSUED
+        status=IssueStatus.ISSUED,
+        actual_return_date=None,
+        updated_at=None,
+        book=book,
+        student=student
     )
     
-    # Update book available copies
-    book.available_copies -= 1
-    
     db.add(db_issue)
+    await record_borrows(db, {student.id: student.department}, [(issue.book_id, issue.student_id)])
     await db.commit()
-    await db.refresh(db_issue)
+    catalog_cache.invalidate_books([issue.book_id])
+    catalog_cache.invalidate_students([issue.student_id])
+    invalidate_chat("book_issued")
     return db_issue
 
+@router.post("/batch", response_model=BookIssueBatchResponse)
+async def issue_books_batch(batch: BookIssueBatchCreate, db: AsyncSession = Depends(get_db)):
+    """Issue several books in one transaction, reporting each item's outcome."""
+    book_ids = {item.book_id for item in batch.items}
+    student_ids = {item.student_id for item in batch.items}
+    
+    # Lock the students first, in id order, as issue_book does, so the
+    # duplicate check below can't race a concurrent checkout for them
+    result = await db.execute(
+        select(Student.id, Student.department)
+        .where(Student.id.in_(student_ids))
+        .order_by(Student.id)
+        .with_for_update()
+    )
+    known_students = dict(result.all())
+    result = await db.execute(select(Book.id, Book.available_copies).where(Book.id.in_(book_ids)))
+    available = dict(result.all())
+    result = await db.execute(
+        select(BookIssue.book_id, BookIssue.student_id).where(
+            and_(
+                BookIssue.book_id.in_(book_ids),
+                BookIssue.student_id.in_(student_ids),
+                BookIssue.status.in_(ACTIVE_STATUSES)
+            )
+        )
+    )
+    already_issued = set(result.all())
+    
+    response = BookIssueBatchResponse()
+    failures = {}
+    wanted = {}
+    for position, item in enumerate(batch.items):
+        error = None
+        if item.book_id not in available:
+            error = "Book not found"
+        elif item.student_id not in known_students:
+            error = "Student not found"
+        elif (item.book_id, item.student_id) in already_issued:
+            error = "Student already has this book issued"
+        if error:
+            failures[position] = error
+            continue
+        already_issued.add((item.book_id, item.student_id))
+        wanted.setdefault(item.book_id, []).append(position)
+    
+    # Take each book's copies with one conditional UPDATE, as issue_book does,
+    # so a concurrent checkout can't be overwritten. If it got there first,
+    # re-read the count and give the copies left to the earliest items.
+    for book_id, positions in sorted(wanted.items()):
+        take = min(len(positions), available[book_id])
+        while take > 0:
+            result = await db.execute(
+                update(Book)
+                .where(and_(Book.id == book_id, Book.available_copies >= take))
+                .values(
+                    available_copies=Book.available_copies - take,
+                    borrow_count=Book.borrow_count + take
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 1:
+                break
+            result = await db.execute(select(Book.available_copies).where(Book.id == book_id))
+            take = min(take, max(result.scalar_one_or_none() or 0, 0))
+        for position in positions[take:]:
+            failures[position] = "No copies available for this book"
+    
+    issued = []
+    for position, item in enumerate(batch.items):
+        if position in failures:
+            response.failed.append(
+                BookIssueBatchFailure(book_id=item.book_id, student_id=item.student_id, error=failures[position])
+            )
+            continue
+        db_issue = BookIssue(
+            book_id=item.book_id,
+            student_id=item.student_id,
+            issue_date=item.issue_date,
+            return_date=item.return_date,
+            status=IssueStatus.ISSUED,
+            actual_return_date=None,
+            updated_at=None
+        )
+        db.add(db_issue)
+        issued.append(db_issue)
+    
+    await record_borrows(db, known_students, [(i.book_id, i.student_id) for i in issued])
+    await db.commit()
+    if issued:
+        catalog_cache.invalidate_books({i.book_id for i in issued})
+        catalog_cache.invalidate_students({i.student_id for i in issued})
+        invalidate_chat("book_issued")
+    response.succeeded = issued
+    return response
+
+@router.put("/batch/return", response_model=BookIssueBatchResponse)
+async def return_books_batch(batch: BookIssueBatchReturn, db: AsyncSession = Depends(get_db)):
+    """Return several issued books in one transaction, reporting each item's outcome."""
+    result = await db.execute(
+        select(BookIssue).where(
+            and_(
+                BookIssue.id.in_(set(batch.issue_ids)),
+                BookIssue.status.in_(ACTIVE_STATUSES)
+            )
+        ).with_for_update()
+    )
+    issues = {issue.id: issue for issue in result.scalars().all()}
+    result = await db.execute(
+        select(Book).where(Book.id.in_({issue.book_id for issue in issues.values()})).with_for_update()
+    )
+    books = {book.id: book for book in result.scalars().all()}
+    
+    response = BookIssueBatchResponse()
+    returned = []
+    now = datetime.now()
+    for issue_id in batch.issue_ids:
+        issue = issues.pop(issue_id, None)
+        if not issue:
+            response.failed.append(
+                BookIssueBatchFailure(issue_id=issue_id, error="Active book issue not found")
+            )
+            continue
+        issue.status = IssueStatus.RETURNED
+        issue.actual_return_date = now
+        books[issue.book_id].available_copies += 1
+        returned.append(issue)
+    
+    await db.commit()
+    if returned:
+        catalog_cache.invalidate_books({issue.book_id for issue in returned})
+        invalidate_chat("book_returned")
+    response.succeeded = returned
+    return response
+
 @router.put("/{issue_id}/return", response_model=BookIssueResponse)
 async def return_book(issue_id: int, db: AsyncSession = Depends(get_db)):
-    # Get book issue
+    # Get book issue, locked so concurrent returns can't both succeed
     result = await db.execute(
-        select(BookIssue).where(
+        select(BookIssue)
+        .options(joinedload(BookIssue.student))
+        .where(
             and_(
                 BookIssue.id == issue_id,
-                BookIssue.status == IssueStatus.ISSUED
+                BookIssue.status.in_(ACTIVE_STATUSES)
             )
         )
+        .with_for_update(of=BookIssue)
     )
     issue = result.scalar_one_or_none()
     if not issue:
@@ -80,105 +273,116 @@ async def return_book(issue_id: int, db: AsyncSession = Depends(get_db)):
         )
     
     # Update issue status and return date
+    now = datetime.now()
     issue.status = IssueStatus.RETURNED
-    issue.actual_return_date = datetime.now()
+    issue.actual_return_date = now
     
-    # Update book available copies
-    issue.book.available_copies += 1
+    # Give the copy back atomically, then read the book for the response
+    await db.execute(
+        update(Book)
+        .where(Book.id == issue.book_id)
+        .values(available_copies=Book.available_copies + 1)
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(
+        select(Book).where(Book.id == issue.book_id).execution_options(populate_existing=True)
+    )
+    issue.book = result.scalar_one()
     
     await db.commit()
-    await db.refresh(issue)
+    catalog_cache.invalidate_books([issue.book_id])
+    invalidate_chat("book_returned")
     return issue
 
 @router.get("/student/{student_id}", response_model=List[BookIssueResponse])
-async def get_student_issues(student_id: int, db: AsyncSession = Depends(get_db)):
+async def get_student_issues(
+    student_id: int,
+    fields: Optional[str] = FIELDS_QUERY,
+    view: Optional[str] = VIEW_QUERY,
+    include_archived: bool = Query(False, description="Also return issues moved to the archive"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    selected = resolve_issue_fields(fields, view)
     # Check if student exists
-    result = await db.execute(select(Student).where(Student.id == student_id))
-    if not result.scalar_one_or_none():
+    if not await catalog_cache.get_student(db, student_id):
         raise HTTPException(status_code=404, detail="Student not found")
     
-    # Get all issues for student
-    query = (
-        select(BookIssue)
-        .options(selectinload(BookIssue.book), selectinload(BookIssue.student))
-        .where(BookIssue.student_id == student_id)
-        .order_by(BookIssue.created_at.desc())
-    )
-    result = await db.execute(query)
-    issues = result.scalars().all()
-    return issues
+    # Get all issues for student, newest first
+    models = (BookIssue, ArchivedBookIssue) if include_archived else (BookIssue,)
+    listings = []
+    for model in models:
+        query = (
+            issue_listing_query(selected, [model.created_at], model)
+            .where(model.student_id == student_id)
+            .order_by(model.created_at.desc())
+        )
+        listings.append(await fetch_issue_listing(db, query, selected))
+    issues = list(merge(*listings, key=lambda issue: issue.created_at, reverse=True))
+    return issue_listing_response(issues, selected)
 
 @router.get("/active", response_model=List[BookIssueResponse])
 async def list_active_issues(
+    response: Response,
     page: int = Query(1, gt=0),
     limit: int = Query(10, gt=0, le=100),
-    db: AsyncSession = Depends(get_db)
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header"),
+    fields: Optional[str] = FIELDS_QUERY,
+    view: Optional[str] = VIEW_QUERY,
+    db: AsyncSession = Depends(get_read_db)
 ):
     """List all currently active book issues with pagination."""
-    query = (
-        select(BookIssue)
-        .options(selectinload(BookIssue.book), selectinload(BookIssue.student))
-        .where(BookIssue.status == IssueStatus.ISSUED)
-        .order_by(BookIssue.return_date.asc())
-        .offset((page - 1) * limit)
-        .limit(limit)
-    )
+    selected = resolve_issue_fields(fields, view)
+    sort_key = [BookIssue.return_date, BookIssue.id]
+    query = issue_listing_query(selected, sort_key).where(BookIssue.status.in_(ACTIVE_STATUSES))
+    query = keyset_paginate(query, sort_key, after, page, limit)
     
-    result = await db.execute(query)
-    issues = result.scalars().all()
-    return issues
+    issues = await fetch_issue_listing(db, query, selected)
+    set_next_cursor(response, issues, sort_key, limit)
+    return issue_listing_response(issues, selected, response)
 
 @router.get("/overdue", response_model=List[BookIssueResponse])
 async def list_overdue_issues(
+    response: Response,
     page: int = Query(1, gt=0),
     limit: int = Query(10, gt=0, le=100),
-    db: AsyncSession = Depends(get_db)
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header"),
+    fields: Optional[str] = FIELDS_QUERY,
+    view: Optional[str] = VIEW_QUERY,
+    db: AsyncSession = Depends(get_read_db)
 ):
     """List all overdue book issues with pagination."""
-    current_date = datetime.now()
-    query = (
-        select(BookIssue)
-        .options(selectinload(BookIssue.book), selectinload(BookIssue.student))
-        .where(
-            and_(
-                BookIssue.status == IssueStatus.ISSUED,
-                BookIssue.return_date < current_date
-            )
-        )
-        .order_by(BookIssue.return_date.asc())
-        .offset((page - 1) * limit)
-        .limit(limit)
-    )
+    selected = resolve_issue_fields(fields, view)
+    sort_key = [BookIssue.return_date, BookIssue.id]
+    query = issue_listing_query(selected, sort_key).where(BookIssue.status == IssueStatus.OVERDUE)
+    query = keyset_paginate(query, sort_key, after, page, limit)
     
-    result = await db.execute(query)
-    issues = result.scalars().all()
-    return issues
+    issues = await fetch_issue_listing(db, query, selected)
+    set_next_cursor(response, issues, sort_key, limit)
+    return issue_listing_response(issues, selected, response)
 
 @router.get("/student/{student_id}/overdue", response_model=List[BookIssueResponse])
 async def get_student_overdue_issues(
     student_id: int,
-    db: AsyncSession = Depends(get_db)
+    fields: Optional[str] = FIELDS_QUERY,
+    view: Optional[str] = VIEW_QUERY,
+    db: AsyncSession = Depends(get_read_db)
 ):
     """List all overdue books for a specific student."""
+    selected = resolve_issue_fields(fields, view)
     # Check if student exists
-    result = await db.execute(select(Student).where(Student.id == student_id))
-    if not result.scalar_one_or_none():
+    if not await catalog_cache.get_student(db, student_id):
         raise HTTPException(status_code=404, detail="Student not found")
     
-    current_date = datetime.now()
     query = (
-        select(BookIssue)
-        .options(selectinload(BookIssue.book), selectinload(BookIssue.student))
+        issue_listing_query(selected)
         .where(
             and_(
                 BookIssue.student_id == student_id,
-                BookIssue.status == IssueStatus.ISSUED,
-                BookIssue.return_date < current_date
+                BookIssue.status == IssueStatus.OVERDUE
             )
         )
         .order_by(BookIssue.return_date.asc())
     )
     
-    result = await db.execute(query)
-    issues = result.scalars().all()
-    return issues 
\ No newline at end of file
+    issues = await fetch_issue_listing(db, query, selected)
+    return issue_listing_response(issues, selected) 
\ No newline at end of file
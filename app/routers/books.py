@@ -1,10 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_
+from sqlalchemy import select, delete, or_
+from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
-from ..database import get_db
+from ..database import get_db, get_read_db
 from ..models.book import Book
-from ..schemas.book import BookCreate, BookUpdate, BookResponse
+from ..schemas.book import BookCreate, BookUpdate, BookResponse, BookImportReport, BOOK_COMPACT_FIELDS
+from ..utils.pagination import keyset_paginate, set_next_cursor
+from ..utils.serialization import fast_response
+from ..utils.fields import FIELDS_QUERY, VIEW_QUERY, resolve_fields, sparse_columns, sparse_response
+from ..utils.search import search_books, index_book, unindex_book
+from ..utils.cache import invalidate_chat
+from ..utils.conditional import cache_control, check_etag
+from ..utils import catalog_cache
 
 router = APIRouter(prefix="/books", tags=["books"])
 
@@ -22,24 +30,52 @@ async def create_book(book: BookCreate, db: AsyncSession = Depends(get_db)):
         isbn=book.isbn,
         total_copies=book.total_copies,
         available_copies=book.total_copies,
-        category=book.category
+        category=book.category,
+        updated_at=None
     )
     db.add(db_book)
     await db.commit()
-    await db.refresh(db_book)
+    index_book(db_book)
+    invalidate_chat("book_added")
     return db_book
 
-@router.get("/", response_model=List[BookResponse])
+@router.post("/import", response_model=BookImportReport)
+async def import_catalog(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    batch_size: int = Query(1000, gt=0, le=5000),
+    db: AsyncSession = Depends(get_db)
+):
+    """Bulk import books from a CSV or NDJSON upload, reporting per-row errors."""
+    # Imported here so workers that never take uploads skip loading the parsers
+    from ..book_import import import_books, detect_format
+    fmt = format or detect_format(file.filename or "")
+    report = await import_books(db, file.file, fmt, batch_size)
+    if report.inserted:
+        invalidate_chat("book_added")
+    return report
+
+@router.get(
+    "/", response_model=List[BookResponse],
+    dependencies=[Depends(cache_control("books.list", "no-cache"))]
+)
 async def list_books(
+    request: Request,
+    response: Response,
     title: Optional[str] = None,
     author: Optional[str] = None,
     category: Optional[str] = None,
     isbn: Optional[str] = None,
     page: int = Query(1, gt=0),
     limit: int = Query(10, gt=0, le=100),
-    db: AsyncSession = Depends(get_db)
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header"),
+    fields: Optional[str] = FIELDS_QUERY,
+    view: Optional[str] = VIEW_QUERY,
+    db: AsyncSession = Depends(get_read_db)
 ):
-    query = select(Book)
+    selected = resolve_fields(fields, view, list(BookResponse.model_fields), BOOK_COMPACT_FIELDS)
+    sort_key = [Book.id]
+    query = select(Book) if selected is None else select(*sparse_columns(Book, selected, sort_key))
     
     # Apply filters
     if title:
@@ -52,18 +88,52 @@ async def list_books(
         query = query.where(Book.isbn.ilike(f"%{isbn}%"))
     
     # Apply pagination
-    query = query.offset((page - 1) * limit).limit(limit)
+    query = keyset_paginate(query, sort_key, after, page, limit)
     
     result = await db.execute(query)
-    books = result.scalars().all()
-    return books
+    books = result.scalars().all() if selected is None else result.all()
+    set_next_cursor(response, books, sort_key, limit)
+    not_modified = check_etag(request, response, books, "books", selected)
+    if not_modified:
+        return not_modified
+    if selected is not None:
+        return sparse_response(books, selected, response)
+    return fast_response(books, BookResponse, response)
 
-@router.get("/{book_id}", response_model=BookResponse)
-async def get_book(book_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Book).where(Book.id == book_id))
-    book = result.scalar_one_or_none()
+@router.get(
+    "/search", response_model=List[BookResponse],
+    dependencies=[Depends(cache_control("books.search", "no-cache"))]
+)
+async def search_catalog(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=255),
+    limit: int = Query(10, gt=0, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Relevance-ranked search over title, author and category, or ISBN prefix."""
+    if len(q) == 13 and q.isdigit():
+        # A full ISBN matches at most one book
+        book = await catalog_cache.get_book_by_isbn(db, q)
+        books = [book] if book else []
+    else:
+        books = await search_books(db, q, limit)
+    not_modified = check_etag(request, response, books, "books")
+    if not_modified:
+        return not_modified
+    return fast_response(books, BookResponse, response)
+
+@router.get(
+    "/{book_id}", response_model=BookResponse,
+    dependencies=[Depends(cache_control("books.get", "no-cache"))]
+)
+async def get_book(book_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_read_db)):
+    book = await catalog_cache.get_book(db, book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
+    not_modified = check_etag(request, response, [book], "book")
+    if not_modified:
+        return not_modified
     return book
 
 @router.put("/{book_id}", response_model=BookResponse)
@@ -72,23 +142,28 @@ async def update_book(
     book_update: BookUpdate,
     db: AsyncSession = Depends(get_db)
 ):
-    result = await db.execute(select(Book).where(Book.id == book_id))
+    # Lock the row so concurrent checkouts can't interleave with the copy adjustment
+    result = await db.execute(select(Book).where(Book.id == book_id).with_for_update())
     db_book = result.scalar_one_or_none()
     if not db_book:
         raise HTTPException(status_code=404, detail="Book not found")
     
-    # Update book fields
-    update_data = book_update.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_book, field, value)
+    old_isbn = db_book.isbn
     
     # If total_copies is updated, adjust available_copies
+    update_data = book_update.model_dump(exclude_unset=True)
     if "total_copies" in update_data:
         difference = update_data["total_copies"] - db_book.total_copies
         db_book.available_copies += difference
     
+    # Update book fields
+    for field, value in update_data.items():
+        setattr(db_book, field, value)
+    
     await db.commit()
-    await db.refresh(db_book)
+    catalog_cache.invalidate_books([book_id], [old_isbn])
+    index_book(db_book)
+    invalidate_chat("book_changed")
     return db_book
 
 @router.delete("/{book_id}")
@@ -105,6 +180,15 @@ async def delete_book(book_id: int, db: AsyncSession = Depends(get_db)):
             detail="Cannot delete book with active issues"
         )
     
-    await db.delete(book)
-    await db.commit()
+    try:
+        await db.execute(delete(Book).where(Book.id == book_id))
+        await db.commit()
+    except IntegrityError:
+        raise HTTPException(
+            status_code=400,
+            detail="Cannot delete book with issue history"
+        )
+    catalog_cache.invalidate_books([book_id], [book.isbn])
+    unindex_book(book_id)
+    invalidate_chat("book_changed")
     return {"message": "Book deleted successfully"} 
\ No newline at end of file
@@ -1,16 +1,18 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from typing import List, Dict, Any
 from datetime import datetime, timedelta
 from sqlalchemy import select, func, and_, desc
 from sqlalchemy.ext.asyncio import AsyncSession
-from ..database import get_db
+from ..database import open_read_session, reads_pinned
 from ..models.book import Book
 from ..models.student import Student
-from ..models.book_issue import BookIssue
+from ..models.book_issue import BookIssue, IssueStatus
+from ..models.borrow_stats import DepartmentBorrowCount
+from ..utils.cache import chat_cache
+from ..utils.intents import IntentMatcher
 from pydantic import BaseModel
 import json
-import asyncio
 
 router = APIRouter()
 
@@ -51,67 +53,58 @@ INTENT_PATTERNS = {
     ]
 }
 
-async def get_overdue_books(db: AsyncSession) -> List[Dict[str, Any]]:
-    result = await db.execute(
-        select(BookIssue, Book, Student)
+def overdue_books_query():
+    return (
+        select(Book.title, Student.name, BookIssue.return_date)
         .join(Book, BookIssue.book_id == Book.id)
         .join(Student, BookIssue.student_id == Student.id)
-        .where(
-            and_(
-                BookIssue.status == "ISSUED",
-                BookIssue.return_date < datetime.now()
-            )
-        )
+        .where(BookIssue.status == IssueStatus.OVERDUE)
+        .order_by(BookIssue.return_date)
     )
-    issues = result.all()
-    return [
-        {
-            "book_title": issue.Book.title,
-            "student_name": issue.Student.name,
-            "days_overdue": (datetime.now() - issue.BookIssue.return_date).days
-        }
-        for issue in issues
-    ]
+
+def overdue_book_row(row) -> Dict[str, Any]:
+    return {
+        "book_title": row.title,
+        "student_name": row.name,
+        "days_overdue": (datetime.now() - row.return_date).days
+    }
+
+async def get_overdue_books(db: AsyncSession) -> List[Dict[str, Any]]:
+    result = await db.execute(overdue_books_query())
+    return [overdue_book_row(row) for row in result.all()]
 
 async def get_department_borrows(db: AsyncSession) -> List[Dict[str, Any]]:
     result = await db.execute(
-        select(
-            Student.department,
-            func.count(BookIssue.id).label("total_borrows")
-        )
-        .join(BookIssue, Student.id == BookIssue.student_id)
-        .group_by(Student.department)
-        .order_by(desc("total_borrows"))
+        select(DepartmentBorrowCount.department, DepartmentBorrowCount.borrow_count)
+        .where(DepartmentBorrowCount.borrow_count > 0)
+        .order_by(desc(DepartmentBorrowCount.borrow_count))
     )
     return [{"department": dept, "total_borrows": count} for dept, count in result.all()]
 
-async def get_new_books(db: AsyncSession) -> List[Dict[str, Any]]:
+def new_books_query():
     week_ago = datetime.now() - timedelta(days=7)
-    result = await db.execute(
-        select(Book)
+    return (
+        select(Book.title, Book.author, Book.created_at)
         .where(Book.created_at >= week_ago)
         .order_by(desc(Book.created_at))
     )
-    books = result.scalars().all()
-    return [
-        {
-            "title": book.title,
-            "author": book.author,
-            "added_date": book.created_at.strftime("%Y-%m-%d")
-        }
-        for book in books
-    ]
+
+def new_book_row(row) -> Dict[str, Any]:
+    return {
+        "title": row.title,
+        "author": row.author,
+        "added_date": row.created_at.strftime("%Y-%m-%d")
+    }
+
+async def get_new_books(db: AsyncSession) -> List[Dict[str, Any]]:
+    result = await db.execute(new_books_query())
+    return [new_book_row(row) for row in result.all()]
 
 async def get_active_students(db: AsyncSession) -> List[Dict[str, Any]]:
     result = await db.execute(
-        select(
-            Student.name,
-            Student.department,
-            func.count(BookIssue.id).label("total_borrows")
-        )
-        .join(BookIssue, Student.id == BookIssue.student_id)
-        .group_by(Student.id)
-        .order_by(desc("total_borrows"))
+        select(Student.name, Student.department, Student.borrow_count)
+        .where(Student.borrow_count > 0)
+        .order_by(desc(Student.borrow_count))
         .limit(5)
     )
     return [
@@ -125,14 +118,9 @@ async def get_active_students(db: AsyncSession) -> List[Dict[str, Any]]:
 
 async def get_popular_books(db: AsyncSession) -> List[Dict[str, Any]]:
     result = await db.execute(
-        select(
-            Book.title,
-            Book.author,
-            func.count(BookIssue.id).label("borrow_count")
-        )
-        .join(BookIssue, Book.id == BookIssue.book_id)
-        .group_by(Book.id)
-        .order_by(desc("borrow_count"))
+        select(Book.title, Book.author, Book.borrow_count)
+        .where(Book.borrow_count > 0)
+        .order_by(desc(Book.borrow_count))
         .limit(5)
     )
     return [
@@ -144,12 +132,16 @@ async def get_popular_books(db: AsyncSession) -> List[Dict[str, Any]]:
         for title, author, count in result.all()
     ]
 
+intent_matcher = IntentMatcher(INTENT_PATTERNS)
+
 def detect_intent(question: str) -> str:
-    question = question.lower().strip()
-    for intent, patterns in INTENT_PATTERNS.items():
-        if any(pattern in question for pattern in patterns):
-            return intent
-    return "unknown"
+    return intent_matcher.match(question)[0]
+
+def format_overdue_book(book: Dict[str, Any]) -> str:
+    return f"- {book['book_title']} (borrowed by {book['student_name']}, {book['days_overdue']} days overdue)\n"
+
+def format_new_book(book: Dict[str, Any]) -> str:
+    return f"- {book['title']} by {book['author']} (added on {book['added_date']})\n"
 
 async def generate_response(intent: str, db: AsyncSession) -> str:
     if intent == "overdue_books":
@@ -158,7 +150,7 @@ async def generate_response(intent: str, db: AsyncSession) -> str:
             return "There are no overdue books at the moment."
         response = f"Found {len(overdue)} overdue books:\n"
         for book in overdue:
-            response += f"- {book['book_title']} (borrowed by {book['student_name']}, {book['days_overdue']} days overdue)\n"
+            response += format_overdue_book(book)
         return response
 
     elif intent == "department_borrows":
@@ -176,7 +168,7 @@ async def generate_response(intent: str, db: AsyncSession) -> str:
             return "No new books have been added in the last week."
         response = f"Added {len(new_books)} new books this week:\n"
         for book in new_books:
-            response += f"- {book['title']} by {book['author']} (added on {book['added_date']})\n"
+            response += format_new_book(book)
         return response
 
     elif intent == "active_students":
@@ -205,19 +197,67 @@ async def generate_response(intent: str, db: AsyncSession) -> str:
                "- Most active students\n" + \
                "- Most popular books"
 
+# Unbounded answers stream straight off a server-side cursor, worded as
+# generate_response words them: intent -> (query, row mapper, line formatter,
+# header, empty message)
+STREAMED_INTENTS = {
+    "overdue_books": (
+        overdue_books_query, overdue_book_row, format_overdue_book,
+        "Found {count} overdue books:\n", "There are no overdue books at the moment."
+    ),
+    "new_books": (
+        new_books_query, new_book_row, format_new_book,
+        "Added {count} new books this week:\n", "No new books have been added in the last week."
+    ),
+}
+
+async def answer(intent: str, prefer_primary: bool = False) -> str:
+    async with await open_read_session(prefer_primary) as db:
+        return await generate_response(intent, db)
+
+async def generate_response_stream(intent: str, prefer_primary: bool = False):
+    """Yield the answer line by line as rows arrive, on a session of its own."""
+    async with await open_read_session(prefer_primary) as db:
+        if intent not in STREAMED_INTENTS:
+            # Small, bounded answers: send them whole
+            yield await generate_response(intent, db)
+            return
+        query, to_row, format_line, header, empty = STREAMED_INTENTS[intent]
+        # The header carries the total, so count first; both reads share a transaction
+        count = (await db.execute(
+            select(func.count()).select_from(query().order_by(None).subquery())
+        )).scalar_one()
+        if not count:
+            yield empty
+            return
+        yield header.format(count=count)
+        result = await db.stream(query().execution_options(yield_per=100))
+        async for row in result:
+            yield format_line(to_row(row))
+
 async def stream_response(response: str):
-    for char in response:
-        yield char
-        await asyncio.sleep(0.01)  # Small delay for streaming effect
+    for line in response.splitlines(keepends=True):
+        yield line
 
+# No session dependency: the streamed answer opens its own for as long as it
+# streams, and a cached answer needs none
 @router.post("/ask")
-async def ask_question(
-    question: Question,
-    db: AsyncSession = Depends(get_db)
-):
-    intent = detect_intent(question.text)
-    response = await generate_response(intent, db)
+async def ask_question(question: Question, request: Request, stream: bool = False):
+    intent, confidence = intent_matcher.match(question.text)
+    headers = {"X-Intent": intent, "X-Intent-Confidence": str(confidence)}
+    prefer_primary = reads_pinned(request)
+    if stream:
+        return StreamingResponse(
+            generate_response_stream(intent, prefer_primary),
+            media_type="text/plain",
+            headers=headers
+        )
+    if intent == "unknown":
+        response = await answer(intent, prefer_primary)
+    else:
+        response = await chat_cache.get_or_compute(intent, lambda: answer(intent, prefer_primary))
     return StreamingResponse(
         stream_response(response),
-        media_type="text/plain"
-    ) 
\ No newline at end of file
+        media_type="text/plain",
+        headers=headers
+    )
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_db, get_pool_status, get_replica_status
+from ..utils.counters import reconcile_counters
+from ..utils.cache import chat_cache
+from ..utils.catalog_cache import catalog_cache_stats
+from ..overdue_sweeper import sweep_stats
+
+router = APIRouter()
+
+@router.get("/pool")
+async def pool_status():
+    """Connection pool usage, for sizing the pool against max_connections."""
+    return {**get_pool_status(), "replica": get_replica_status()}
+
+@router.get("/cache")
+async def cache_status():
+    """Hit/miss counters and approximate size of the chat answer and book/student caches."""
+    return {"chat": chat_cache.stats(), **catalog_cache_stats()}
+
+@router.get("/sweeper")
+async def sweeper_status():
+    """Duration and rows touched by the overdue sweeper."""
+    return sweep_stats.as_dict()
+
+@router.post("/counters/reconcile")
+async def reconcile_borrow_counters(fix: bool = False, db: AsyncSession = Depends(get_db)):
+    """Compare borrow counters with the issue history, rebuilding them when fix=true."""
+    return await reconcile_counters(db, fix)
@@ -1,10 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_
+from sqlalchemy import select, delete, or_
 from typing import List, Optional
-from ..database import get_db
+from ..database import get_db, get_read_db, reads_pinned
 from ..models.student import Student
-from ..schemas.student import StudentCreate, StudentUpdate, StudentResponse
+from ..models.book_issue import BookIssue, ArchivedBookIssue
+from ..schemas.student import StudentCreate, StudentUpdate, StudentResponse, RosterSyncReport, STUDENT_COMPACT_FIELDS
+from ..schemas.book_issue import StudentDashboard
+from ..student_dashboard import load_dashboard
+from ..utils.pagination import keyset_paginate, set_next_cursor
+from ..utils.serialization import fast_response
+from ..utils.fields import FIELDS_QUERY, VIEW_QUERY, resolve_fields, sparse_columns, sparse_response
+from ..utils.search import search_students, index_student, unindex_student
+from ..utils.counters import move_department_borrows
+from ..utils.cache import invalidate_chat
+from ..utils.conditional import cache_control, check_etag
+from ..utils import catalog_cache
 
 router = APIRouter(prefix="/students", tags=["students"])
 
@@ -12,13 +23,13 @@ router = APIRouter(prefix="/students", tags=["students"])
 async def create_student(student: StudentCreate, db: AsyncSession = Depends(get_db)):
     # Check if roll number, phone, or email already exists
     result = await db.execute(
-        select(Student).where(
+        select(Student.id).where(
             or_(
                 Student.roll_number == student.roll_number,
                 Student.phone == student.phone,
                 Student.email == student.email
             )
-        )
+        ).limit(1)
     )
     if result.scalar_one_or_none():
         raise HTTPException(
@@ -27,20 +38,46 @@ async def create_student(student: StudentCreate, db: AsyncSession = Depends(get_
         )
     
     # Create new student
-    db_student = Student(**student.model_dump())
+    db_student = Student(**student.model_dump(), updated_at=None)
     db.add(db_student)
     await db.commit()
-    await db.refresh(db_student)
+    index_student(db_student)
     return db_student
 
-@router.get("/", response_model=List[StudentResponse])
+@router.post("/sync", response_model=RosterSyncReport)
+async def sync_student_roster(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    batch_size: int = Query(1000, gt=0, le=5000),
+    dry_run: bool = False,
+    db: AsyncSession = Depends(get_db)
+):
+    """Insert and update students from the full semester roster (CSV or NDJSON), reporting conflicts."""
+    # Imported here so workers that never take uploads skip loading the parsers
+    from ..roster_sync import sync_roster
+    from ..book_import import detect_format
+    return await sync_roster(db, file.file, format or detect_format(file.filename or ""), batch_size, dry_run)
+
+@router.get(
+    "/", response_model=List[StudentResponse],
+    dependencies=[Depends(cache_control("students.list", "private, no-cache"))]
+)
 async def list_students(
+    request: Request,
+    response: Response,
     department: Optional[str] = None,
     semester: Optional[int] = None,
     search: Optional[str] = None,
-    db: AsyncSession = Depends(get_db)
+    page: int = Query(1, gt=0),
+    limit: int = Query(10, gt=0, le=100),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header"),
+    fields: Optional[str] = FIELDS_QUERY,
+    view: Optional[str] = VIEW_QUERY,
+    db: AsyncSession = Depends(get_read_db)
 ):
-    query = select(Student)
+    selected = resolve_fields(fields, view, list(StudentResponse.model_fields), STUDENT_COMPACT_FIELDS)
+    sort_key = [Student.id]
+    query = select(Student) if selected is None else select(*sparse_columns(Student, selected, sort_key))
     
     # Apply filters
     if department:
@@ -56,18 +93,65 @@ async def list_students(
             )
         )
     
+    # Apply pagination
+    query = keyset_paginate(query, sort_key, after, page, limit)
+    
     result = await db.execute(query)
-    students = result.scalars().all()
-    return students
+    students = result.scalars().all() if selected is None else result.all()
+    set_next_cursor(response, students, sort_key, limit)
+    not_modified = check_etag(request, response, students, "students", selected)
+    if not_modified:
+        return not_modified
+    if selected is not None:
+        return sparse_response(students, selected, response)
+    return fast_response(students, StudentResponse, response)
 
-@router.get("/{student_id}", response_model=StudentResponse)
-async def get_student(student_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Student).where(Student.id == student_id))
-    student = result.scalar_one_or_none()
+@router.get(
+    "/search", response_model=List[StudentResponse],
+    dependencies=[Depends(cache_control("students.search", "private, no-cache"))]
+)
+async def search_student_directory(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=255),
+    limit: int = Query(10, gt=0, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Relevance-ranked search over name, roll number and department, or phone prefix."""
+    student = None
+    if q.isalnum() and not q.isalpha() and not q.isdigit():
+        # Letters and digits look like a roll number; an exact match is the answer
+        student = await catalog_cache.get_student_by_roll_number(db, q)
+    students = [student] if student else await search_students(db, q, limit)
+    not_modified = check_etag(request, response, students, "students")
+    if not_modified:
+        return not_modified
+    return fast_response(students, StudentResponse, response)
+
+@router.get(
+    "/{student_id}", response_model=StudentResponse,
+    dependencies=[Depends(cache_control("students.get", "private, no-cache"))]
+)
+async def get_student(student_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_read_db)):
+    student = await catalog_cache.get_student(db, student_id)
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
+    not_modified = check_etag(request, response, [student], "student")
+    if not_modified:
+        return not_modified
     return student
 
+@router.get(
+    "/{student_id}/dashboard", response_model=StudentDashboard,
+    dependencies=[Depends(cache_control("students.dashboard", "private, no-cache"))]
+)
+async def get_student_dashboard(student_id: int, request: Request):
+    """Everything the student portal shows in one call: profile, active and overdue issues, totals."""
+    dashboard = await load_dashboard(student_id, reads_pinned(request))
+    if dashboard is None:
+        raise HTTPException(status_code=404, detail="Student not found")
+    return dashboard
+
 @router.put("/{student_id}", response_model=StudentResponse)
 async def update_student(
     student_id: int,
@@ -82,13 +166,13 @@ async def update_student(
     # Check for unique constraints if updating roll number, phone, or email
     update_data = student_update.model_dump(exclude_unset=True)
     if any(field in update_data for field in ["roll_number", "phone", "email"]):
-        query = select(Student).where(
+        query = select(Student.id).where(
             or_(
                 Student.roll_number == update_data.get("roll_number", db_student.roll_number),
                 Student.phone == update_data.get("phone", db_student.phone),
                 Student.email == update_data.get("email", db_student.email)
             )
-        ).where(Student.id != student_id)
+        ).where(Student.id != student_id).limit(1)
         result = await db.execute(query)
         if result.scalar_one_or_none():
             raise HTTPException(
@@ -96,28 +180,47 @@ async def update_student(
                 detail="Student with this roll number, phone, or email already exists"
             )
     
+    # Carry the student's borrows over to their new department's counter
+    if "department" in update_data:
+        await move_department_borrows(
+            db, db_student.department, update_data["department"], db_student.borrow_count
+        )
+    
     # Update student fields
+    old_roll_number = db_student.roll_number
     for field, value in update_data.items():
         setattr(db_student, field, value)
     
     await db.commit()
-    await db.refresh(db_student)
+    catalog_cache.invalidate_students([student_id], [old_roll_number])
+    index_student(db_student)
+    invalidate_chat("student_changed")
     return db_student
 
 @router.delete("/{student_id}")
 async def delete_student(student_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Student).where(Student.id == student_id))
-    student = result.scalar_one_or_none()
-    if not student:
+    # Check the student exists and whether they have any book issues, hot or archived, in one query
+    has_issues = or_(
+        select(BookIssue.id).where(BookIssue.student_id == Student.id).exists(),
+        select(ArchivedBookIssue.id).where(ArchivedBookIssue.student_id == Student.id).exists()
+    )
+    result = await db.execute(
+        select(Student.id, has_issues.label("has_issues")).where(Student.id == student_id)
+    )
+    row = result.one_or_none()
+    if not row:
         raise HTTPException(status_code=404, detail="Student not found")
     
     # Check if student has any active book issues
-    if student.issues:
+    if row.has_issues:
         raise HTTPException(
             status_code=400,
             detail="Cannot delete student with active book issues"
         )
     
-    await db.delete(student)
+    await db.execute(delete(Student).where(Student.id == student_id))
     await db.commit()
+    catalog_cache.invalidate_students([student_id])
+    unindex_student(student_id)
+    invalidate_chat("student_changed")
     return {"message": "Student deleted successfully"} 
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class BookBase(BaseModel):
@@ -29,4 +29,17 @@ class BookInDB(BookBase):
         from_attributes = True
 
 class BookResponse(BookInDB):
-    pass 
\ No newline at end of file
+    pass
+
+# Fields sent for ?view=compact on the book listing
+BOOK_COMPACT_FIELDS = ("id", "title", "author", "isbn", "available_copies")
+
+class BookImportError(BaseModel):
+    row: int
+    isbn: Optional[str] = None
+    error: str
+
+class BookImportReport(BaseModel):
+    processed: int = 0
+    inserted: int = 0
+    errors: List[BookImportError] = []
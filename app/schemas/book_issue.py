@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from .book import BookResponse
 from .student import StudentResponse
@@ -30,4 +30,39 @@ class BookIssueInDB(BookIssueBase):
 
 class BookIssueResponse(BookIssueInDB):
     book: BookResponse
-    student: StudentResponse 
\ No newline at end of file
+    student: StudentResponse
+
+# Fields sent for ?view=compact on the issue listings; book and student are
+# only loaded when asked for through ?fields=
+ISSUE_COMPACT_FIELDS = ("id", "book_id", "student_id", "return_date", "status")
+ISSUE_NESTED_FIELDS = {"book": BookResponse, "student": StudentResponse}
+
+class BookIssueBatchCreate(BaseModel):
+    items: List[BookIssueCreate] = Field(..., min_length=1, max_length=50)
+
+class BookIssueBatchReturn(BaseModel):
+    issue_ids: List[int] = Field(..., min_length=1, max_length=50)
+
+class BookIssueBatchFailure(BaseModel):
+    book_id: Optional[int] = None
+    student_id: Optional[int] = None
+    issue_id: Optional[int] = None
+    error: str
+
+class BookIssueBatchResponse(BaseModel):
+    succeeded: List[BookIssueInDB] = []
+    failed: List[BookIssueBatchFailure] = []
+
+class StudentBorrowTotals(BaseModel):
+    # Every issue the student ever had, archived ones included
+    borrowed: int
+    active: int
+    overdue: int
+    returned: int
+
+class StudentDashboard(BaseModel):
+    student: StudentResponse
+    # Books still out, overdue ones included, due soonest first
+    active_issues: List[BookIssueResponse]
+    overdue_issues: List[BookIssueResponse]
+    totals: StudentBorrowTotals
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class StudentBase(BaseModel):
@@ -30,4 +30,22 @@ class StudentInDB(StudentBase):
         from_attributes = True
 
 class StudentResponse(StudentInDB):
-    pass 
\ No newline at end of file
+    pass
+
+# Fields sent for ?view=compact on the student listing
+STUDENT_COMPACT_FIELDS = ("id", "name", "roll_number", "department")
+ 
+class RosterSyncError(BaseModel):
+    row: int
+    roll_number: Optional[str] = None
+    error: str
+
+class RosterSyncReport(BaseModel):
+    processed: int = 0
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    # Students in the database that the roster doesn't list; never deleted
+    not_in_roster: int = 0
+    dry_run: bool = False
+    errors: List[RosterSyncError] = []
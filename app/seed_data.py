@@ -4,7 +4,9 @@ from sqlalchemy import select, delete
 from .database import async_session
 from .models.book import Book
 from .models.student import Student
-from .models.book_issue import BookIssue, IssueStatus
+from .models.book_issue import BookIssue, ArchivedBookIssue, IssueStatus
+from .models.borrow_stats import DepartmentBorrowCount
+from .utils.counters import reconcile_counters
 
 # Sample books data
 books_data = [
@@ -122,8 +124,10 @@ async def seed_database():
     async with async_session() as session:
         # Clear existing data
         await session.execute(delete(BookIssue))
+        await session.execute(delete(ArchivedBookIssue))
         await session.execute(delete(Book))
         await session.execute(delete(Student))
+        await session.execute(delete(DepartmentBorrowCount))
         await session.commit()
 
         # Add books
@@ -160,6 +164,9 @@ async def seed_database():
 
         await session.commit()
 
+        # Bring the borrow counters in line with the seeded history
+        await reconcile_counters(session)
+
 if __name__ == "__main__":
     import asyncio
     asyncio.run(seed_database()) 
\ No newline at end of file
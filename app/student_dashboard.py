@@ -0,0 +1,66 @@
+import asyncio
+from typing import Awaitable, Callable, Optional
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from .config import settings
+from .database import open_read_session
+from .models.book_issue import BookIssue, ArchivedBookIssue, IssueStatus, ACTIVE_STATUSES
+from .schemas.book_issue import StudentBorrowTotals
+from .utils import catalog_cache
+
+async def _issues(db: AsyncSession, student_id: int, statuses) -> list:
+    result = await db.execute(
+        select(BookIssue)
+        .options(selectinload(BookIssue.book), selectinload(BookIssue.student))
+        .where(BookIssue.student_id == student_id, BookIssue.status.in_(statuses))
+        .order_by(BookIssue.return_date.asc())
+    )
+    return result.scalars().all()
+
+async def _totals(db: AsyncSession, student_id: int) -> StudentBorrowTotals:
+    # Both counts are read off the (student_id, ...) indexes
+    result = await db.execute(
+        select(BookIssue.status, func.count())
+        .where(BookIssue.student_id == student_id)
+        .group_by(BookIssue.status)
+    )
+    counts = dict(result.all())
+    result = await db.execute(
+        select(func.count()).select_from(ArchivedBookIssue).where(ArchivedBookIssue.student_id == student_id)
+    )
+    archived = result.scalar_one()
+    returned = counts.get(IssueStatus.RETURNED, 0) + archived
+    active = sum(counts.get(status, 0) for status in ACTIVE_STATUSES)
+    return StudentBorrowTotals(
+        borrowed=active + returned, active=active, overdue=counts.get(IssueStatus.OVERDUE, 0), returned=returned
+    )
+
+async def _on_own_session(load: Callable[[AsyncSession], Awaitable], prefer_primary: bool):
+    async with await open_read_session(prefer_primary) as db:
+        return await load(db)
+
+# Fan-outs that can run at once, each needing up to three connections
+_fan_outs = asyncio.Semaphore(max(1, (settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW) // 3))
+
+async def load_dashboard(student_id: int, prefer_primary: bool = False) -> Optional[dict]:
+    """Profile, active and overdue issues and borrowing totals for one student,
+    or None if there is no such student.
+
+    The profile comes first, usually from the catalog cache, so an unknown id
+    costs one lookup. The other three parts then run concurrently, each on a
+    session of its own, so the page costs about as much as its slowest query
+    rather than their sum. No part holds a connection while waiting for
+    another, and _fan_outs keeps concurrent dashboards within the pool.
+    """
+    async with await open_read_session(prefer_primary) as db:
+        student = await catalog_cache.get_student(db, student_id)
+    if student is None:
+        return None
+    async with _fan_outs:
+        active, overdue, totals = await asyncio.gather(
+            _on_own_session(lambda db: _issues(db, student_id, ACTIVE_STATUSES), prefer_primary),
+            _on_own_session(lambda db: _issues(db, student_id, [IssueStatus.OVERDUE]), prefer_primary),
+            _on_own_session(lambda db: _totals(db, student_id), prefer_primary),
+        )
+    return {"student": student, "active_issues": active, "overdue_issues": overdue, "totals": totals}
@@ -0,0 +1,259 @@
+import math
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Iterator, List, Optional
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from .models.book import Book
+from .models.student import Student
+from .models.book_issue import BookIssue, ArchivedBookIssue, IssueStatus, ACTIVE_STATUSES
+from .models.borrow_stats import DepartmentBorrowCount
+from .utils.counters import reconcile_counters
+
+# Rows generated at scale 1; --scale 100 gives 500k books, 50k students, 10M issues
+BASE_BOOKS = 5_000
+BASE_STUDENTS = 500
+BASE_ISSUES = 100_000
+
+LOAN_DAYS = 14
+
+FIRST_NAMES = (
+    "James Mary Robert Patricia John Jennifer Michael Linda David Elizabeth William Barbara Richard Susan "
+    "Joseph Jessica Thomas Sarah Charles Karen Aarav Priya Rohan Ananya Arjun Diya Wei Mei Hiroshi Yuki"
+).split()
+LAST_NAMES = (
+    "Smith Johnson Williams Brown Jones Garcia Miller Davis Wilson Anderson Taylor Thomas Moore Martin "
+    "Lee Clark Lewis Walker Hall Young Sharma Patel Gupta Singh Kumar Chen Wang Tanaka Sato Okafor"
+).split()
+TITLE_WORDS = (
+    "history science shadow river empire garden silent machine winter ocean ancient modern theory "
+    "practice journey kingdom secret light dark stone algebra physics biology chemistry poetry letters "
+    "war peace city island storm glass iron silver memory forest mountain engine signal harbor"
+).split()
+CATEGORIES = (
+    "Fiction", "Science Fiction", "Fantasy", "Romance", "Mystery", "History", "Biography", "Science",
+    "Mathematics", "Engineering", "Computer Science", "Philosophy", "Poetry", "Economics", "Art",
+)
+# (department, roll number prefix, share of students)
+DEPARTMENTS = (
+    ("Computer Science", "CS", 0.22), ("Electrical Engineering", "EE", 0.14),
+    ("Mechanical Engineering", "ME", 0.14), ("Civil Engineering", "CE", 0.10),
+    ("Mathematics", "MA", 0.08), ("Physics", "PH", 0.07), ("Chemistry", "CH", 0.07),
+    ("Economics", "EC", 0.07), ("English", "EN", 0.06), ("History", "HI", 0.05),
+)
+
+@dataclass
+class SyntheticConfig:
+    books: int
+    students: int
+    issues: int
+    seed: int = 42
+    batch_size: int = 5_000
+    as_of: Optional[datetime] = None
+    history_days: int = 730
+    # Higher skews concentrate borrowing on fewer books and students
+    book_skew: float = 3.0
+    student_skew: float = 2.0
+    # Share of students who often keep books past the due date, and how often they (and everyone else) do
+    late_students: float = 0.1
+    late_rate: float = 0.2
+    overdue_rate: float = 0.01
+
+    @classmethod
+    def scaled(cls, scale: float, **overrides) -> "SyntheticConfig":
+        return cls(
+            books=max(1, int(BASE_BOOKS * scale)),
+            students=max(1, int(BASE_STUDENTS * scale)),
+            issues=int(BASE_ISSUES * scale),
+            **overrides,
+        )
+
+@dataclass
+class PhaseReport:
+    table: str
+    rows: int
+    skipped: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+class _Ranking:
+    """Map popularity ranks onto ids so the popular rows are spread over the table."""
+
+    def __init__(self, size: int, skew: float):
+        self.size = size
+        self.skew = skew
+        self.stride = next(s for s in range(7919, 7919 + size + 1) if math.gcd(s, size) == 1)
+        self.inverse = pow(self.stride, -1, size) if size > 1 else 0
+
+    def pick(self, rng: random.Random) -> int:
+        rank = min(int(self.size * rng.random() ** self.skew), self.size - 1)
+        return rank * self.stride % self.size + 1
+
+    def rank(self, row_id: int) -> int:
+        return (row_id - 1) * self.inverse % self.size
+
+def _isbn(n: int) -> str:
+    digits = f"979{n:09d}"
+    check = (10 - sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits)) % 10) % 10
+    return digits + str(check)
+
+class SyntheticData:
+    """Deterministic row generator; row n of a table only depends on the seed and n."""
+
+    def __init__(self, config: SyntheticConfig):
+        self.config = config
+        self.as_of = config.as_of or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.books = _Ranking(config.books, config.book_skew)
+        self.students = _Ranking(config.students, config.student_skew)
+        risk = random.Random(f"{config.seed}:risk")
+        self.late_students = {
+            student_id for student_id in range(1, config.students + 1) if risk.random() < config.late_students
+        }
+
+    def _rng(self, table: str, batch: int) -> random.Random:
+        return random.Random(f"{self.config.seed}:{table}:{batch}")
+
+    def book_rows(self, start: int, stop: int) -> List[dict]:
+        rng = self._rng("books", start // self.config.batch_size)
+        span = timedelta(days=self.config.history_days * 3)
+        rows = []
+        for row_id in range(start + 1, stop + 1):
+            # Popular titles are stocked with more copies
+            popularity = 1 - self.books.rank(row_id) / self.config.books
+            rows.append({
+                "id": row_id,
+                "title": " ".join(rng.sample(TITLE_WORDS, rng.randint(2, 4))).title(),
+                "author": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                "isbn": _isbn(row_id),
+                "total_copies": 1 + int(9 * popularity ** 8) + rng.randint(0, 2),
+                "available_copies": 0,
+                "category": rng.choice(CATEGORIES),
+                "borrow_count": 0,
+                "created_at": self.as_of - span * (1 - row_id / self.config.books) - timedelta(minutes=rng.randint(0, 1439)),
+            })
+        return rows
+
+    def student_rows(self, start: int, stop: int) -> List[dict]:
+        rng = self._rng("students", start // self.config.batch_size)
+        weights = [share for _, _, share in DEPARTMENTS]
+        rows = []
+        for row_id in range(start + 1, stop + 1):
+            department, prefix, _ = rng.choices(DEPARTMENTS, weights)[0]
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            rows.append({
+                "id": row_id,
+                "name": f"{first} {last}",
+                "roll_number": f"{prefix}{row_id:08d}",
+                "department": department,
+                "semester": rng.randint(1, 8),
+                "phone": f"{6000000000 + row_id}",
+                "email": f"{first.lower()}.{last.lower()}.{row_id}@example.edu",
+                "borrow_count": 0,
+                "created_at": self.as_of - timedelta(days=rng.randint(0, self.config.history_days)),
+            })
+        return rows
+
+    def issue_rows(self, start: int, stop: int) -> List[dict]:
+        config = self.config
+        rng = self._rng("book_issues", start // config.batch_size)
+        history = timedelta(days=config.history_days)
+        rows = []
+        for row_id in range(start + 1, stop + 1):
+            # Ids follow issue dates, like a live system
+            issue_date = self.as_of - history * (1 - row_id / config.issues) - timedelta(minutes=rng.randint(0, 600))
+            return_date = issue_date + timedelta(days=LOAN_DAYS)
+            student_id = self.students.pick(rng)
+            late = student_id in self.late_students
+            actual_return_date, status = None, IssueStatus.ISSUED
+            if return_date < self.as_of:
+                # Recent loans are the ones still out; old ones were almost all brought back
+                recent = (self.as_of - return_date).days < 60
+                if rng.random() < (config.late_rate if late else config.overdue_rate) * (1 if recent else 0.05):
+                    status = IssueStatus.OVERDUE
+                else:
+                    days_out = rng.randint(1, LOAN_DAYS + (21 if late and rng.random() < config.late_rate else 0))
+                    actual_return_date = min(issue_date + timedelta(days=days_out, hours=rng.randint(0, 8)), self.as_of)
+                    status = IssueStatus.RETURNED
+            rows.append({
+                "id": row_id,
+                "book_id": self.books.pick(rng),
+                "student_id": student_id,
+                "issue_date": issue_date,
+                "return_date": return_date,
+                "actual_return_date": actual_return_date,
+                "status": status,
+                "created_at": issue_date,
+            })
+        return rows
+
+async def clear_library(engine: AsyncEngine):
+    async with engine.begin() as conn:
+        for model in (BookIssue, ArchivedBookIssue, Book, Student, DepartmentBorrowCount):
+            await conn.execute(delete(model))
+
+async def _load(
+    engine: AsyncEngine, model, rows_for: Callable[[int, int], List[dict]], total: int, batch_size: int,
+    progress: Callable[[str], None],
+) -> PhaseReport:
+    table = model.__tablename__
+    async with engine.connect() as conn:
+        # Batches commit one at a time in id order, so the highest id is where a previous run stopped
+        done = (await conn.execute(select(func.max(model.id)))).scalar() or 0
+    started = time.perf_counter()
+    for start in _batches(done, total, batch_size):
+        stop = min(start + batch_size, total)
+        rows = rows_for(start - start % batch_size, stop)[start % batch_size:]
+        async with engine.begin() as conn:
+            await conn.execute(insert(model), rows)
+        elapsed = time.perf_counter() - started
+        progress(f"  {table}: {stop:,}/{total:,} rows ({(stop - done) / elapsed:,.0f} rows/s)")
+    return PhaseReport(table, max(total - done, 0), min(done, total), time.perf_counter() - started)
+
+def _batches(done: int, total: int, batch_size: int) -> Iterator[int]:
+    start = done
+    while start < total:
+        yield start
+        start = start - start % batch_size + batch_size
+
+async def _settle_copies(engine: AsyncEngine, books: int, batch_size: int):
+    # Keep total_copies >= books out on loan, and available_copies = the rest
+    out = (
+        select(func.count(BookIssue.id))
+        .where(BookIssue.book_id == Book.id, BookIssue.status.in_(ACTIVE_STATUSES))
+        .scalar_subquery()
+    )
+    for start in range(0, books, batch_size):
+        in_batch = Book.id.between(start + 1, start + batch_size)
+        async with engine.begin() as conn:
+            await conn.execute(update(Book).where(in_batch, Book.total_copies < out).values(total_copies=out))
+            await conn.execute(update(Book).where(in_batch).values(available_copies=Book.total_copies - out))
+
+async def generate_library(
+    engine: AsyncEngine, config: SyntheticConfig, resume: bool = False, progress: Callable[[str], None] = print
+) -> List[PhaseReport]:
+    """Fill the library with `config`-sized synthetic data using batched inserts.
+
+    With `resume`, tables keep the rows a previous run with the same config
+    committed and generation picks up after them.
+    """
+    if not resume:
+        await clear_library(engine)
+    data = SyntheticData(config)
+    reports = [
+        await _load(engine, Book, data.book_rows, config.books, config.batch_size, progress),
+        await _load(engine, Student, data.student_rows, config.students, config.batch_size, progress),
+        await _load(engine, BookIssue, data.issue_rows, config.issues, config.batch_size, progress),
+    ]
+
+    progress("  settling available copies and borrow counters...")
+    started = time.perf_counter()
+    await _settle_copies(engine, config.books, config.batch_size)
+    async with AsyncSession(engine) as session:
+        await reconcile_counters(session)
+    reports.append(PhaseReport("counters", config.books + config.students, 0, time.perf_counter() - started))
+    return reports
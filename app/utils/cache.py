@@ -0,0 +1,137 @@
+import asyncio
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable
+from ..config import settings
+
+def _approx_size(value) -> int:
+    size = sys.getsizeof(value)
+    if isinstance(value, (tuple, list)):
+        size += sum(sys.getsizeof(item) for item in value)
+    return size
+
+class ResultCache:
+    """Bounded LRU cache with a TTL, explicit invalidation and single-flight.
+
+    Concurrent misses for the same key share one computation; if the request
+    computing it is cancelled, a waiting one takes over. A key that is
+    invalidated while its value is being computed is not stored, so a write
+    racing with a slow query can't leave a stale entry behind.
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._dirty = set()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable, default=None):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return default
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, keys: Iterable[Hashable]):
+        for key in keys:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+            if key in self._inflight:
+                self._dirty.add(key)
+
+    def clear(self):
+        self.invalidate(list(self._entries) + list(self._inflight))
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]]):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            while inflight is not None:
+                try:
+                    return await asyncio.shield(inflight)
+                except asyncio.CancelledError:
+                    task = asyncio.current_task()
+                    if not inflight.cancelled() or (task is not None and task.cancelling()):
+                        raise
+                # The leading request was cancelled (e.g. its client went away),
+                # not this one: wait on whoever took over, or take over ourselves
+                inflight = self._inflight.get(key)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()  # waiters re-raise it; don't log it as unretrieved
+            raise
+        finally:
+            del self._inflight[key]
+            stale = key in self._dirty
+            self._dirty.discard(key)
+        future.set_result(value)
+        if not stale:
+            self.set(key, value)
+        return value
+
+    def approx_bytes(self) -> int:
+        """Rough memory held by the entries (keys, values and one level of their items)."""
+        return sum(_approx_size(key) + sys.getsizeof(entry) + _approx_size(entry[1]) for key, entry in self._entries.items())
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "approx_bytes": self.approx_bytes(),
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
+
+chat_cache = ResultCache(ttl=settings.CHAT_CACHE_TTL, max_size=settings.CHAT_CACHE_MAX_SIZE)
+
+# Which cached chat answers each kind of write can change
+CHAT_INVALIDATIONS = {
+    "book_added": ("new_books",),
+    "book_changed": ("overdue_books", "new_books", "popular_books"),
+    "student_changed": ("overdue_books", "department_borrows", "active_students"),
+    "book_issued": ("overdue_books", "department_borrows", "active_students", "popular_books"),
+    "book_returned": ("overdue_books", "popular_books"),
+    "counters_rebuilt": ("department_borrows", "active_students", "popular_books"),
+    "issues_overdue": ("overdue_books",),
+}
+
+def invalidate_chat(event: str):
+    chat_cache.invalidate(CHAT_INVALIDATIONS[event])
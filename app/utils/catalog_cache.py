@@ -0,0 +1,88 @@
+from collections import namedtuple
+from functools import lru_cache
+from typing import Iterable
+from sqlalchemy import inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..config import settings
+from ..database import read_engine
+from ..models.book import Book
+from ..models.student import Student
+from .cache import ResultCache
+
+# Read-only snapshots of hot rows for GET handlers, keyed by id, with
+# ("isbn", ...) / ("roll_number", ...) keys mapping to the id. Write handlers
+# always read (and lock) the rows themselves, so available_copies on the
+# write path never comes from here.
+book_cache = ResultCache(ttl=settings.CATALOG_CACHE_TTL, max_size=settings.CATALOG_CACHE_MAX_SIZE)
+student_cache = ResultCache(ttl=settings.CATALOG_CACHE_TTL, max_size=settings.CATALOG_CACHE_MAX_SIZE)
+
+class _NotFound(Exception):
+    """Raised inside a cache load so missing rows aren't cached."""
+
+@lru_cache(maxsize=None)
+def _snapshot_type(model):
+    return namedtuple(f"Cached{model.__name__}", [attr.key for attr in inspect(model).column_attrs])
+
+def snapshot(row):
+    """Immutable copy of an ORM row's columns, safe to share between sessions."""
+    snapshot_type = _snapshot_type(type(row))
+    return snapshot_type._make(getattr(row, key) for key in snapshot_type._fields)
+
+def _on_replica(db: AsyncSession) -> bool:
+    # A lagging replica could refill an entry a write just invalidated with the old row
+    return read_engine is not None and db.bind is read_engine
+
+async def _cached(cache: ResultCache, db: AsyncSession, key, load):
+    try:
+        if _on_replica(db):
+            return await load()
+        return await cache.get_or_compute(key, load)
+    except _NotFound:
+        return None
+
+async def _by_id(cache: ResultCache, db: AsyncSession, model, row_id: int):
+    async def load():
+        row = (await db.execute(select(model).where(model.id == row_id))).scalar_one_or_none()
+        if row is None:
+            raise _NotFound
+        return snapshot(row)
+    return await _cached(cache, db, row_id, load)
+
+async def _by_unique(cache: ResultCache, db: AsyncSession, model, column, value: str):
+    async def load():
+        row_id = (await db.execute(select(model.id).where(column == value))).scalar_one_or_none()
+        if row_id is None:
+            raise _NotFound
+        return row_id
+    key = (column.key, value)
+    row_id = await _cached(cache, db, key, load)
+    if row_id is None:
+        return None
+    row = await _by_id(cache, db, model, row_id)
+    if row is None or getattr(row, column.key) != value:
+        # The row was deleted or re-keyed since the mapping was cached
+        cache.invalidate([key])
+        row_id = await _cached(cache, db, key, load)
+        row = await _by_id(cache, db, model, row_id) if row_id is not None else None
+    return row
+
+async def get_book(db: AsyncSession, book_id: int):
+    return await _by_id(book_cache, db, Book, book_id)
+
+async def get_book_by_isbn(db: AsyncSession, isbn: str):
+    return await _by_unique(book_cache, db, Book, Book.isbn, isbn)
+
+async def get_student(db: AsyncSession, student_id: int):
+    return await _by_id(student_cache, db, Student, student_id)
+
+async def get_student_by_roll_number(db: AsyncSession, roll_number: str):
+    return await _by_unique(student_cache, db, Student, Student.roll_number, roll_number)
+
+def invalidate_books(book_ids: Iterable[int], isbns: Iterable[str] = ()):
+    book_cache.invalidate(list(book_ids) + [("isbn", isbn) for isbn in isbns])
+
+def invalidate_students(student_ids: Iterable[int], roll_numbers: Iterable[str] = ()):
+    student_cache.invalidate(list(student_ids) + [("roll_number", roll) for roll in roll_numbers])
+
+def catalog_cache_stats() -> dict:
+    return {"books": book_cache.stats(), "students": student_cache.stats()}
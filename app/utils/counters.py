@@ -0,0 +1,113 @@
+from collections import Counter
+from typing import Dict, List
+from sqlalchemy import case, select, update, func, union_all
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.book import Book
+from ..models.student import Student
+from ..models.book_issue import BookIssue, ArchivedBookIssue
+from ..models.borrow_stats import DepartmentBorrowCount
+from .cache import invalidate_chat
+from .catalog_cache import book_cache, student_cache
+
+def _department_upsert(dialect_name: str, rows: List[dict]):
+    if dialect_name == "mysql":
+        stmt = mysql.insert(DepartmentBorrowCount).values(rows)
+        return stmt.on_duplicate_key_update(
+            borrow_count=DepartmentBorrowCount.borrow_count + stmt.inserted.borrow_count
+        )
+    stmt = sqlite.insert(DepartmentBorrowCount).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[DepartmentBorrowCount.department],
+        set_={"borrow_count": DepartmentBorrowCount.borrow_count + stmt.excluded.borrow_count}
+    )
+
+async def record_borrows(db: AsyncSession, students: Dict[int, str], borrows: List[tuple]):
+    """Bump student and department borrow counters for new issues.
+
+    `students` maps student id to department and `borrows` holds one
+    (book_id, student_id) pair per new issue. Book counters are bumped by the
+    callers alongside the available_copies decrement.
+    """
+    per_student = Counter(student_id for _, student_id in borrows)
+    per_department = Counter()
+    for student_id, count in per_student.items():
+        per_department[students[student_id]] += count
+    if per_student:
+        # One UPDATE for the whole batch rather than one per student
+        await db.execute(
+            update(Student)
+            .where(Student.id.in_(per_student))
+            .values(borrow_count=Student.borrow_count + case(per_student, value=Student.id, else_=0))
+            .execution_options(synchronize_session=False)
+        )
+    if per_department:
+        rows = [{"department": dept, "borrow_count": count} for dept, count in per_department.items()]
+        await db.execute(_department_upsert(db.get_bind().dialect.name, rows))
+
+async def move_department_borrows(db: AsyncSession, old: str, new: str, count: int):
+    """Carry a student's borrows over when they change department."""
+    if not count or old == new:
+        return
+    await db.execute(
+        update(DepartmentBorrowCount)
+        .where(DepartmentBorrowCount.department == old)
+        .values(borrow_count=DepartmentBorrowCount.borrow_count - count)
+    )
+    await db.execute(_department_upsert(db.get_bind().dialect.name, [{"department": new, "borrow_count": count}]))
+
+def _issue_history():
+    """Every issue ever made, from book_issues and its archive."""
+    return union_all(
+        select(BookIssue.id, BookIssue.book_id, BookIssue.student_id),
+        select(ArchivedBookIssue.id, ArchivedBookIssue.book_id, ArchivedBookIssue.student_id),
+    ).subquery("issue_history")
+
+async def _reconcile_model(db: AsyncSession, model, fk: str, fix: bool) -> dict:
+    history = _issue_history()
+    actual = func.count(history.c.id)
+    result = await db.execute(
+        select(model.id, model.borrow_count, actual)
+        .outerjoin(history, history.c[fk] == model.id)
+        .group_by(model.id, model.borrow_count)
+        .having(model.borrow_count != actual)
+    )
+    drift = [{"id": row_id, "stored": stored, "actual": count} for row_id, stored, count in result.all()]
+    if fix and drift:
+        await db.execute(update(model), [{"id": d["id"], "borrow_count": d["actual"]} for d in drift])
+    return {"drifted": len(drift), "examples": drift[:10]}
+
+async def _reconcile_departments(db: AsyncSession, fix: bool) -> dict:
+    history = _issue_history()
+    result = await db.execute(
+        select(Student.department, func.count(history.c.id))
+        .join(history, history.c.student_id == Student.id)
+        .group_by(Student.department)
+    )
+    actual = dict(result.all())
+    result = await db.execute(select(DepartmentBorrowCount.department, DepartmentBorrowCount.borrow_count))
+    stored = dict(result.all())
+    drift = [
+        {"department": dept, "stored": stored.get(dept, 0), "actual": actual.get(dept, 0)}
+        for dept in sorted(set(actual) | set(stored))
+        if stored.get(dept, 0) != actual.get(dept, 0)
+    ]
+    if fix and drift:
+        rows = [{"department": d["department"], "borrow_count": d["actual"] - d["stored"]} for d in drift]
+        await db.execute(_department_upsert(db.get_bind().dialect.name, rows))
+    return {"drifted": len(drift), "examples": drift[:10]}
+
+async def reconcile_counters(db: AsyncSession, fix: bool = True) -> dict:
+    """Rebuild borrow counters from the issue history (archive included) and report any drift."""
+    report = {
+        "books": await _reconcile_model(db, Book, "book_id", fix),
+        "students": await _reconcile_model(db, Student, "student_id", fix),
+        "departments": await _reconcile_departments(db, fix),
+        "fixed": fix,
+    }
+    if fix:
+        await db.commit()
+        book_cache.clear()
+        student_cache.clear()
+        invalidate_chat("counters_rebuilt")
+    return report
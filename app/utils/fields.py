@@ -0,0 +1,47 @@
+from typing import Dict, List, Optional, Sequence
+from fastapi import HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from .pagination import forwarded_headers
+
+FIELDS_QUERY = Query(None, description="Comma-separated fields to return, e.g. id,title")
+VIEW_QUERY = Query(None, pattern="^(full|compact)$", description="`compact` returns a trimmed set of fields")
+
+def resolve_fields(
+    fields: Optional[str], view: Optional[str], allowed: Sequence[str], compact: Sequence[str]
+) -> Optional[List[str]]:
+    """Fields to send for a `fields=`/`view=` request, or None for the full model."""
+    if fields:
+        requested = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+        unknown = [f for f in requested if f not in allowed]
+        if unknown or not requested:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(allowed)}"
+            )
+        return requested
+    if view == "compact":
+        return list(compact)
+    return None
+
+def sparse_columns(model, fields: Sequence[str], sort_key: Sequence = ()) -> list:
+    """Columns to select for `fields`, plus any sort key columns the cursor needs."""
+    names = list(fields) + [column.key for column in sort_key if column.key not in fields]
+    return [getattr(model, name) for name in names]
+
+def sparse_response(
+    rows: Sequence, fields: Sequence[str], response: Optional[Response] = None, nested: Dict[str, type] = None
+) -> JSONResponse:
+    """Serialize only `fields` of each row, keeping the pagination cursor header.
+
+    `nested` maps relationship fields to the schema used to render them.
+    """
+    nested = nested or {}
+    content = [
+        {
+            field: nested[field].model_validate(getattr(row, field)) if field in nested else getattr(row, field)
+            for field in fields
+        }
+        for row in rows
+    ]
+    return JSONResponse(content=jsonable_encoder(content), headers=forwarded_headers(response))
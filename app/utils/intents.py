@@ -0,0 +1,109 @@
+import math
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+from .search import tokenize
+
+STOP_WORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "me", "show", "list", "what",
+    "which", "who", "how", "many", "much", "of", "in", "on", "for", "to", "this",
+    "do", "does", "did", "give", "tell", "please", "there", "with",
+}
+TYPO_SIMILARITY = 0.8
+MIN_TYPO_LENGTH = 4
+
+def _deletes(word: str) -> Set[str]:
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+class IntentMatcher:
+    """Token index over intent phrasings, compiled once.
+
+    Each phrasing is scored by the idf-weighted share of its words found in
+    the question, in any order. Known words in the question that none of the
+    intent's phrasings use count against it, so "top department" doesn't
+    borrow "top books" (where "books" is too common to weigh much). Words within one edit of a
+    known word (a dropped, extra, swapped or wrong letter) count at reduced
+    weight, found through a precomputed single-deletion index so lookup cost
+    does not grow with the vocabulary. A phrasing that appears verbatim gets a
+    small bonus.
+    """
+
+    def __init__(self, patterns: Dict[str, List[str]], threshold: float = 0.55):
+        self.threshold = threshold
+        self._phrases: List[Tuple[str, str, float]] = []
+        self._vocabulary: Dict[str, Set[str]] = defaultdict(set)
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        self._deletes: Dict[str, Set[str]] = defaultdict(set)
+        self._intent_order = {intent: i for i, intent in enumerate(patterns)}
+
+        phrase_words = []
+        for intent, phrasings in patterns.items():
+            for phrase in phrasings:
+                words = set(tokenize(phrase)) - STOP_WORDS or set(tokenize(phrase))
+                phrase_words.append((intent, " ".join(tokenize(phrase)), words))
+        total = len(phrase_words)
+        document_frequency = defaultdict(int)
+        for _, _, words in phrase_words:
+            for word in words:
+                document_frequency[word] += 1
+        self._weights = {word: math.log(1 + total / df) for word, df in document_frequency.items()}
+
+        for phrase_id, (intent, normalized, words) in enumerate(phrase_words):
+            total_weight = sum(self._weights[word] for word in words)
+            self._phrases.append((intent, f" {normalized} ", total_weight))
+            self._vocabulary[intent] |= words
+            for word in words:
+                self._postings[word].append(phrase_id)
+        for word in self._postings:
+            if len(word) >= MIN_TYPO_LENGTH:
+                for deleted in _deletes(word):
+                    self._deletes[deleted].add(word)
+
+    def _known_words(self, word: str) -> Dict[str, float]:
+        if word in self._postings:
+            return {word: 1.0}
+        if len(word) < MIN_TYPO_LENGTH - 1:
+            return {}
+        matches = {known: TYPO_SIMILARITY for known in self._deletes.get(word, ())}
+        for deleted in _deletes(word):
+            if deleted in self._postings and len(deleted) >= MIN_TYPO_LENGTH:
+                matches[deleted] = TYPO_SIMILARITY
+            for known in self._deletes.get(deleted, ()):
+                matches[known] = TYPO_SIMILARITY
+        return matches
+
+    def match(self, question: str) -> Tuple[str, float]:
+        """Return the best intent for `question` and a confidence in [0, 1]."""
+        words = tokenize(question)
+        normalized = f" {' '.join(words)} "
+        similarities: Dict[str, float] = {}
+        # Each question word's known-word candidates, for weighing the off-topic ones
+        candidates: List[Tuple[Dict[str, float], float]] = []
+        for word in set(words) - STOP_WORDS or set(words):
+            known_words = self._known_words(word)
+            if known_words:
+                candidates.append((known_words, max(self._weights[k] * s for k, s in known_words.items())))
+            for known, similarity in known_words.items():
+                similarities[known] = max(similarity, similarities.get(known, 0.0))
+        matched: Dict[int, float] = defaultdict(float)
+        for known, similarity in similarities.items():
+            weight = self._weights[known] * similarity
+            for phrase_id in self._postings[known]:
+                matched[phrase_id] += weight
+
+        off_topic: Dict[str, float] = {}
+        best_intent, best_score = "unknown", 0.0
+        for phrase_id, weight in matched.items():
+            intent, phrase, total_weight = self._phrases[phrase_id]
+            if intent not in off_topic:
+                vocabulary = self._vocabulary[intent]
+                off_topic[intent] = sum(w for known_words, w in candidates if vocabulary.isdisjoint(known_words))
+            score = 0.9 * weight / (total_weight + off_topic[intent])
+            if phrase in normalized:
+                score += 0.1
+            if score > best_score or (
+                score == best_score and self._intent_order[intent] < self._intent_order.get(best_intent, len(self._intent_order))
+            ):
+                best_intent, best_score = intent, score
+        if best_score < self.threshold:
+            return "unknown", round(best_score, 3)
+        return best_intent, round(best_score, 3)
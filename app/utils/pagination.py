@@ -0,0 +1,71 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+from fastapi import HTTPException, Response
+from sqlalchemy import DateTime, Integer, String, and_, or_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _cursor_value(column, value):
+    """`value` as the type of `column`, rejecting anything the column can't hold."""
+    if isinstance(column.type, DateTime):
+        if not isinstance(value, str):
+            raise TypeError("expected an ISO datetime")
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, Integer):
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise TypeError("expected an integer")
+        return value
+    if isinstance(column.type, String):
+        if not isinstance(value, str):
+            raise TypeError("expected a string")
+        return value
+    if not isinstance(value, (int, float, str)) or isinstance(value, bool):
+        raise TypeError("expected a scalar")
+    return value
+
+def decode_cursor(token: str, columns: Sequence) -> List[Any]:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("cursor does not match sort key")
+        return [_cursor_value(column, value) for column, value in zip(columns, values)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+def keyset_paginate(query, columns: Sequence, after: Optional[str], page: int, limit: int):
+    """Order by the sort key and seek past the cursor, falling back to offset paging."""
+    query = query.order_by(*[column.asc() for column in columns])
+    if after:
+        values = decode_cursor(after, columns)
+        # Row-value comparison (a, b) > (x, y), spelled out for portability
+        conditions = []
+        for i, column in enumerate(columns):
+            equal_prefix = [columns[j] == values[j] for j in range(i)]
+            conditions.append(and_(*equal_prefix, column > values[i]))
+        query = query.where(or_(*conditions))
+    else:
+        query = query.offset((page - 1) * limit)
+    return query.limit(limit)
+
+# Headers handlers set on the injected Response that must survive returning their own Response
+FORWARDED_HEADERS = (NEXT_CURSOR_HEADER, "ETag", "Cache-Control")
+
+def forwarded_headers(response: Optional[Response]) -> dict:
+    """The cursor and cache headers set on `response`, for handlers that return their own Response."""
+    if response is None:
+        return {}
+    return {name: response.headers[name] for name in FORWARDED_HEADERS if name in response.headers}
+
+def set_next_cursor(response: Response, rows: Sequence, columns: Sequence, limit: int):
+    """Expose the cursor for the page after `rows`, if there may be one."""
+    if len(rows) == limit:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([getattr(last, column.key) for column in columns])
@@ -0,0 +1,234 @@
+import asyncio
+import heapq
+import math
+import re
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.mysql import match
+from ..config import settings
+from ..models.book import Book
+from ..models.student import Student
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: str) -> List[str]:
+    return _WORD_RE.findall(text.lower())
+
+def trigrams(word: str) -> Set[str]:
+    padded = f"${word}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class _IndexState:
+    """Documents, postings and vocabulary trigrams of one TextIndex.
+
+    A rebuild fills a new one off the event loop; once swapped in it is only
+    changed on the loop, so a search never sees it half-updated.
+    """
+
+    def __init__(self):
+        self.docs: Dict[int, Tuple[str, ...]] = {}
+        self.postings: Dict[str, Set[int]] = defaultdict(set)
+        self.vocab_trigrams: Dict[str, Set[str]] = defaultdict(set)
+
+    @classmethod
+    def build(cls, rows: Iterable[tuple]) -> "_IndexState":
+        state = cls()
+        for doc_id, *fields in rows:
+            state.add(doc_id, fields)
+        return state
+
+    def add(self, doc_id: int, fields: Sequence[str]):
+        self.remove(doc_id)
+        words = tuple(set(tokenize(" ".join(f for f in fields if f))))
+        self.docs[doc_id] = words
+        for word in words:
+            if word not in self.postings:
+                for gram in trigrams(word):
+                    self.vocab_trigrams[gram].add(word)
+            self.postings[word].add(doc_id)
+
+    def remove(self, doc_id: int):
+        for word in self.docs.pop(doc_id, ()):
+            postings = self.postings[word]
+            postings.discard(doc_id)
+            if not postings:
+                del self.postings[word]
+                for gram in trigrams(word):
+                    self.vocab_trigrams[gram].discard(word)
+
+class TextIndex:
+    """In-process inverted index with a trigram index over its vocabulary.
+
+    Query words are matched against indexed words by trigram similarity, so
+    partial words and small typos still hit, and documents are ranked by the
+    idf-weighted similarity of every query word they contain.
+    """
+
+    def __init__(self, min_similarity: float = 0.25):
+        self.min_similarity = min_similarity
+        self.loaded_at = None
+        self.lock = asyncio.Lock()
+        self._state = _IndexState()
+        # Adds/removes made while a reload is running, replayed onto its result
+        self._journal: Optional[List[Tuple[int, Optional[Sequence[str]]]]] = None
+        self._generation = 0
+
+    def __len__(self):
+        return len(self._state.docs)
+
+    @property
+    def stale(self) -> bool:
+        if self.loaded_at is None:
+            return True
+        return time.monotonic() - self.loaded_at > settings.SEARCH_INDEX_TTL
+
+    @property
+    def tracking(self) -> bool:
+        """Whether single-row changes need applying: loaded, or being loaded."""
+        return self.loaded_at is not None or self._journal is not None
+
+    def invalidate(self):
+        self.loaded_at = None
+        self._generation += 1
+
+    def add(self, doc_id: int, *fields: str):
+        self._state.add(doc_id, fields)
+        if self._journal is not None:
+            self._journal.append((doc_id, fields))
+
+    def remove(self, doc_id: int):
+        self._state.remove(doc_id)
+        if self._journal is not None:
+            self._journal.append((doc_id, None))
+
+    async def reload(self, fetch_rows: Callable[[], Awaitable[List[tuple]]]):
+        """Rebuild from `fetch_rows()` in a worker thread and swap the result in.
+
+        Adds and removes made while the rows are read and indexed are replayed
+        on the new state before the swap, so they aren't lost until the next
+        rebuild. An invalidate() meanwhile leaves the index stale.
+        """
+        generation = self._generation
+        self._journal = []
+        try:
+            rows = await fetch_rows()
+            state = await asyncio.to_thread(_IndexState.build, rows)
+            # No awaits from here on: nothing can change the index in between
+            for doc_id, fields in self._journal:
+                if fields is None:
+                    state.remove(doc_id)
+                else:
+                    state.add(doc_id, fields)
+            self._state = state
+        finally:
+            self._journal = None
+        if generation == self._generation:
+            self.loaded_at = time.monotonic()
+
+    def _similar_words(self, state: _IndexState, word: str) -> Dict[str, float]:
+        grams = trigrams(word)
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for candidate in state.vocab_trigrams.get(gram, ()):
+                shared[candidate] += 1
+        similar = {}
+        for candidate, count in shared.items():
+            score = count / (len(grams) + len(trigrams(candidate)) - count)
+            if candidate.startswith(word):
+                score = max(score, 0.9)
+            if score >= self.min_similarity:
+                similar[candidate] = score
+        return similar
+
+    def search(self, query: str, limit: int) -> List[int]:
+        state = self._state
+        total = len(state.docs)
+        scores: Dict[int, float] = defaultdict(float)
+        for word in set(tokenize(query)):
+            for candidate, similarity in self._similar_words(state, word).items():
+                postings = state.postings[candidate]
+                weight = similarity * math.log(1 + total / len(postings))
+                for doc_id in postings:
+                    scores[doc_id] += weight
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [doc_id for doc_id, _ in best]
+
+book_index = TextIndex()
+student_index = TextIndex()
+
+def index_book(book: Book):
+    if book_index.tracking:
+        book_index.add(book.id, book.title, book.author, book.category)
+
+def index_student(student: Student):
+    if student_index.tracking:
+        student_index.add(student.id, student.name, student.roll_number, student.department)
+
+def unindex_book(book_id: int):
+    book_index.remove(book_id)
+
+def unindex_student(student_id: int):
+    student_index.remove(student_id)
+
+async def _ensure_loaded(index: TextIndex, db: AsyncSession, columns):
+    if not index.stale:
+        return
+    async with index.lock:
+        if index.stale:
+            async def fetch_rows():
+                result = await db.stream(select(*columns).execution_options(yield_per=5000))
+                return [tuple(row) async for row in result]
+            await index.reload(fetch_rows)
+
+def use_fulltext(db: AsyncSession) -> bool:
+    if settings.SEARCH_BACKEND == "auto":
+        return db.get_bind().dialect.name == "mysql"
+    return settings.SEARCH_BACKEND == "fulltext"
+
+def prefix_range(column, prefix: str):
+    """`column LIKE 'prefix%'` as a range an index can seek, unlike a bound LIKE pattern."""
+    return and_(column >= prefix, column < prefix[:-1] + chr(ord(prefix[-1]) + 1))
+
+async def search_books(db: AsyncSession, q: str, limit: int) -> List[Book]:
+    """Relevance-ranked catalog search over title, author and category."""
+    if q.isdigit():
+        # ISBN lookups are prefix matches the unique isbn index can serve
+        result = await db.execute(
+            select(Book).where(prefix_range(Book.isbn, q)).order_by(Book.isbn).limit(limit)
+        )
+        return result.scalars().all()
+    if use_fulltext(db):
+        relevance = match(Book.title, Book.author, Book.category, against=q)
+        result = await db.execute(
+            select(Book).where(relevance).order_by(relevance.desc()).limit(limit)
+        )
+        return result.scalars().all()
+    await _ensure_loaded(book_index, db, [Book.id, Book.title, Book.author, Book.category])
+    return await _fetch_ranked(db, Book, book_index.search(q, limit))
+
+async def search_students(db: AsyncSession, q: str, limit: int) -> List[Student]:
+    """Relevance-ranked student search over name, roll number and department."""
+    if q.isdigit():
+        # Phone lookups are prefix matches the unique phone index can serve
+        result = await db.execute(
+            select(Student).where(prefix_range(Student.phone, q)).order_by(Student.phone).limit(limit)
+        )
+        return result.scalars().all()
+    if use_fulltext(db):
+        relevance = match(Student.name, Student.roll_number, Student.department, against=q)
+        result = await db.execute(
+            select(Student).where(relevance).order_by(relevance.desc()).limit(limit)
+        )
+        return result.scalars().all()
+    await _ensure_loaded(student_index, db, [Student.id, Student.name, Student.roll_number, Student.department])
+    return await _fetch_ranked(db, Student, student_index.search(q, limit))
+
+async def _fetch_ranked(db: AsyncSession, model, ids: List[int]):
+    if not ids:
+        return []
+    result = await db.execute(select(model).where(model.id.in_(ids)))
+    rows = {row.id: row for row in result.scalars().all()}
+    return [rows[doc_id] for doc_id in ids if doc_id in rows]
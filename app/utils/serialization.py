@@ -0,0 +1,83 @@
+import enum
+import json
+import typing
+from datetime import date, datetime
+from typing import Callable, Dict, Optional, Sequence
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from ..config import settings
+from .pagination import forwarded_headers
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the stdlib encoder
+    orjson = None
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when it is installed; same bytes either way."""
+
+    def render(self, content) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content)
+        return super().render(content)
+
+def _datetime(value: datetime) -> str:
+    # Pydantic writes UTC as "Z" rather than "+00:00"
+    text = value.isoformat()
+    return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+def _converter(annotation) -> Optional[Callable]:
+    """How to turn a value of `annotation` into JSON types, or None if it already is one."""
+    if typing.get_origin(annotation) is typing.Union:
+        inner = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        if len(inner) != 1:
+            raise TypeError(f"Unsupported field type {annotation!r}")
+        convert = _converter(inner[0])
+        if convert is None:
+            return None
+        return lambda value: None if value is None else convert(value)
+    if not isinstance(annotation, type):
+        raise TypeError(f"Unsupported field type {annotation!r}")
+    if issubclass(annotation, BaseModel):
+        return serializer_for(annotation).serialize
+    if issubclass(annotation, datetime):
+        return _datetime
+    if issubclass(annotation, date):
+        return date.isoformat
+    if issubclass(annotation, enum.Enum):
+        return lambda value: value.value
+    return None
+
+class RowSerializer:
+    """Attribute-to-JSON mapping for a response schema, worked out once.
+
+    Reads ORM rows straight into dicts shaped like `schema.model_dump(mode="json")`
+    without validating them, so it is only for rows loaded from the database.
+    """
+
+    def __init__(self, schema: typing.Type[BaseModel]):
+        self.schema = schema
+        self.fields = [(name, _converter(field.annotation)) for name, field in schema.model_fields.items()]
+
+    def serialize(self, row) -> dict:
+        data = {}
+        for name, convert in self.fields:
+            value = getattr(row, name)
+            data[name] = value if convert is None else convert(value)
+        return data
+
+_serializers: Dict[type, RowSerializer] = {}
+
+def serializer_for(schema: typing.Type[BaseModel]) -> RowSerializer:
+    if schema not in _serializers:
+        _serializers[schema] = RowSerializer(schema)
+    return _serializers[schema]
+
+def fast_response(rows: Sequence, schema: typing.Type[BaseModel], response: Optional[Response] = None):
+    """Encode ORM rows directly when FAST_RESPONSES is on; otherwise return them
+    for the usual response_model validation."""
+    if not settings.FAST_RESPONSES:
+        return rows
+    serialize = serializer_for(schema).serialize
+    return FastJSONResponse([serialize(row) for row in rows], headers=forwarded_headers(response))
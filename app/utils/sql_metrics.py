@@ -0,0 +1,132 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger("app.sql")
+
+# IN lists of any length ("IN (?, ?, ?)") collapse to one shape
+_PLACEHOLDER_LIST = re.compile(
+    r"\bIN\s*\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))+\s*\)", re.IGNORECASE
+)
+_WHITESPACE = re.compile(r"\s+")
+
+def statement_shape(statement: str) -> str:
+    return _PLACEHOLDER_LIST.sub("IN (?)", _WHITESPACE.sub(" ", statement)).strip()
+
+class RequestSQLStats:
+    """Statements and database time spent by one request."""
+
+    __slots__ = ("statements", "duration", "_seen")
+
+    def __init__(self):
+        self.statements = 0
+        self.duration = 0.0
+        self._seen = Counter()
+
+    def record(self, statement: str, duration: float, executemany: bool = False):
+        self.statements += 1
+        self.duration += duration
+        # An executemany (e.g. an ORM flush of several rows) is one call from
+        # the app even when the driver runs it row by row
+        if not executemany:
+            self._seen[statement] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statement shapes run more than `threshold` times, most repeated first."""
+        shapes = Counter()
+        for statement, count in self._seen.items():
+            shapes[statement_shape(statement)] += count
+        return [(shape, count) for shape, count in shapes.most_common() if count > threshold]
+
+current_sql_stats: ContextVar[Optional[RequestSQLStats]] = ContextVar("current_sql_stats", default=None)
+
+def instrument_engine(engine):
+    """Time every statement on `engine` into the current request's stats."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("sql_metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def stop_timer(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["sql_metrics_started"].pop()
+        stats = current_sql_stats.get()
+        if stats is not None:
+            stats.record(statement, time.perf_counter() - started, executemany)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def drop_timer(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("sql_metrics_started"):
+            connection.info["sql_metrics_started"].pop()
+
+class SQLMetricsMiddleware:
+    """Count statements and DB time per request.
+
+    Totals go out in a Server-Timing header and in one log record per
+    request (with the numbers as structured fields). Statement shapes repeated
+    more than `n_plus_one_threshold` times are logged as likely N+1 queries.
+    Statements run after the response has started (streamed bodies, session
+    teardown) only make it into the log record.
+    """
+
+    def __init__(self, app, n_plus_one_threshold: int = 5):
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestSQLStats()
+        token = current_sql_stats.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", self.server_timing(stats, time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_sql_stats.reset(token)
+            self.report(scope, status, stats, time.perf_counter() - started)
+
+    def server_timing(self, stats: RequestSQLStats, elapsed: float) -> str:
+        timing = f'db;dur={stats.duration * 1000:.2f};desc="{stats.statements} queries", app;dur={elapsed * 1000:.2f}'
+        repeated = stats.repeated(self.n_plus_one_threshold)
+        if repeated:
+            timing += f', n-plus-one;desc="{repeated[0][1]}x same statement"'
+        return timing
+
+    def report(self, scope, status: int, stats: RequestSQLStats, elapsed: float):
+        fields = {
+            "http_method": scope["method"],
+            "http_path": scope["path"],
+            "http_status": status,
+            "sql_statements": stats.statements,
+            "sql_ms": round(stats.duration * 1000, 3),
+            "duration_ms": round(elapsed * 1000, 3),
+        }
+        logger.info(
+            "%s %s %d: %d statements, %.1f ms in DB, %.1f ms total",
+            scope["method"], scope["path"], status, stats.statements, fields["sql_ms"], fields["duration_ms"],
+            extra=fields,
+        )
+        for shape, count in stats.repeated(self.n_plus_one_threshold):
+            logger.warning(
+                "Possible N+1 in %s %s: %d x %s", scope["method"], scope["path"], count, shape[:300],
+                extra={**fields, "sql_repeats": count, "sql_shape": shape},
+            )
@@ -0,0 +1,29 @@
+import argparse
+import asyncio
+from app.config import settings
+from app.database import async_session, engine
+from app.issue_archive import archive_returned_issues, count_archivable
+
+async def run(older_than_days: int, batch_size: int, max_batches: int, dry_run: bool):
+    try:
+        async with async_session() as session:
+            if dry_run:
+                return await count_archivable(session, older_than_days)
+            return await archive_returned_issues(session, older_than_days, batch_size, max_batches)
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move old returned issues from book_issues to book_issues_archive")
+    parser.add_argument("--older-than-days", type=int, default=settings.ISSUE_ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=settings.ISSUE_ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--max-batches", type=int, default=None, help="stop after this many batches")
+    parser.add_argument("--dry-run", action="store_true", help="only count the issues that would move")
+    args = parser.parse_args()
+
+    print(f"Archiving issues returned more than {args.older_than_days} days ago...")
+    result = asyncio.run(run(args.older_than_days, args.batch_size, args.max_batches, args.dry_run))
+    if args.dry_run:
+        print(f"{result} issues would be archived. Dry run, nothing changed.")
+    else:
+        print(f"Archived {result.rows} issues in {result.batches} batches ({result.seconds:.1f} s)")
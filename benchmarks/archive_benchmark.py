@@ -0,0 +1,189 @@
+"""
+Time the hot-path book_issues queries before and after archiving old returned
+issues, on a synthetic library (--scale 100 is 10M issues).
+
+    python -m benchmarks.archive_benchmark --scale 10
+    python -m benchmarks.archive_benchmark --database-url mysql+aiomysql://... --scale 100 --older-than-days 90
+
+With --keep-data the library from a previous run is reused; anything it
+archived is moved back first so "before" sees the full hot table.
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import statistics
+import time
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///archive_benchmark.db")
+    parser.add_argument("--scale", type=float, default=10, help="synthetic library scale; 100 is 10M issues")
+    parser.add_argument("--older-than-days", type=int, default=90)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep-data", action="store_true", help="reuse the library from a previous run")
+    return parser.parse_args()
+
+async def restore_archive(engine):
+    """Move archived issues back into book_issues, undoing a previous run."""
+    from sqlalchemy import delete, insert, select
+    from app.issue_archive import ARCHIVED_COLUMNS
+    from app.models.book_issue import ArchivedBookIssue, BookIssue
+
+    async with engine.begin() as conn:
+        await conn.execute(insert(BookIssue).from_select(
+            ARCHIVED_COLUMNS, select(*[getattr(ArchivedBookIssue, key) for key in ARCHIVED_COLUMNS])
+        ))
+        await conn.execute(delete(ArchivedBookIssue))
+
+async def analyze(engine):
+    from app.database import Base
+
+    async with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            await conn.exec_driver_sql("ANALYZE")
+        else:
+            for table in Base.metadata.sorted_tables:
+                await conn.exec_driver_sql(f"ANALYZE TABLE {table.name}")
+
+def hot_path(rng: random.Random, students: list, pairs: list, busiest: int):
+    """(name, statement factory) for the queries the issue and chat endpoints run."""
+    from datetime import datetime
+    from sqlalchemy import and_, func, select
+    from app.models.book_issue import BookIssue, IssueStatus, ACTIVE_STATUSES
+    from app.models.student import Student
+    from app.routers.book_issues import issue_listing_query
+    from app.routers.conversation import overdue_books_query
+    from app.utils.pagination import keyset_paginate
+
+    sort_key = [BookIssue.return_date, BookIssue.id]
+
+    def history(student_id):
+        return (
+            issue_listing_query(["id", "book_id", "status", "created_at"])
+            .where(BookIssue.student_id == student_id)
+            .order_by(BookIssue.created_at.desc())
+        )
+
+    def already_issued():
+        book_id, student_id = rng.choice(pairs)
+        return select(
+            select(BookIssue.id).where(and_(
+                BookIssue.book_id == book_id, BookIssue.student_id == student_id,
+                BookIssue.status.in_(ACTIVE_STATUSES)
+            )).exists()
+        )
+
+    def has_issues():
+        return select(Student.id, select(BookIssue.id).where(BookIssue.student_id == Student.id).exists()).where(
+            Student.id == rng.choice(students)
+        )
+
+    return [
+        ("active issues page", lambda: keyset_paginate(
+            issue_listing_query(["id", "book_id", "student_id", "return_date", "status"], sort_key)
+            .where(BookIssue.status.in_(ACTIVE_STATUSES)), sort_key, None, 1, 20)),
+        ("active issues page 50", lambda: keyset_paginate(
+            issue_listing_query(["id", "book_id", "student_id", "return_date", "status"], sort_key)
+            .where(BookIssue.status.in_(ACTIVE_STATUSES)), sort_key, None, 50, 20)),
+        ("overdue issues page", lambda: keyset_paginate(
+            issue_listing_query(["id", "book_id", "student_id", "return_date", "status"], sort_key)
+            .where(BookIssue.status == IssueStatus.OVERDUE), sort_key, None, 1, 20)),
+        ("overdue sweep batch", lambda: select(BookIssue.id).where(and_(
+            BookIssue.status == IssueStatus.ISSUED, BookIssue.return_date < datetime.now()
+        )).order_by(BookIssue.return_date).limit(1000)),
+        ("chat overdue books", overdue_books_query),
+        ("active issue count", lambda: select(func.count(BookIssue.id)).where(BookIssue.status.in_(ACTIVE_STATUSES))),
+        ("student history", lambda: history(rng.choice(students))),
+        ("busiest student history", lambda: history(busiest)),
+        ("duplicate issue check", already_issued),
+        ("delete student check", has_issues),
+    ]
+
+async def measure(session, queries, repeat: int) -> dict:
+    timings = {}
+    for name, statement in queries:
+        # One untimed run to warm the cache
+        (await session.execute(statement())).all()
+        samples = []
+        for _ in range(repeat):
+            stmt = statement()
+            start = time.perf_counter()
+            (await session.execute(stmt)).all()
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        timings[name] = (statistics.median(samples), samples[max(0, math.ceil(len(samples) * 0.95) - 1)])
+    return timings
+
+async def table_sizes(session) -> dict:
+    from sqlalchemy import func, select
+    from app.models.book_issue import ArchivedBookIssue, BookIssue
+
+    return {
+        "book_issues": (await session.execute(select(func.count(BookIssue.id)))).scalar_one(),
+        "book_issues_archive": (await session.execute(select(func.count(ArchivedBookIssue.id)))).scalar_one(),
+    }
+
+async def main():
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.database_url
+    from sqlalchemy import select
+    from app.database import engine, async_session
+    from app.issue_archive import archive_returned_issues
+    from app.migrations import migrate
+    from app.models.book_issue import BookIssue, ACTIVE_STATUSES
+    from app.models.student import Student
+    from app.synthetic_data import SyntheticConfig, generate_library
+    from app.utils.counters import reconcile_counters
+
+    try:
+        await migrate(engine)
+        if args.keep_data:
+            await restore_archive(engine)
+        else:
+            print(f"Generating a scale {args.scale} library...")
+            await generate_library(engine, SyntheticConfig.scaled(args.scale, seed=args.seed), progress=lambda _: None)
+        await analyze(engine)
+
+        rng = random.Random(args.seed)
+        async with async_session() as session:
+            students = list((await session.execute(select(Student.id))).scalars().all())
+            pairs = (await session.execute(
+                select(BookIssue.book_id, BookIssue.student_id).where(BookIssue.status.in_(ACTIVE_STATUSES)).limit(1000)
+            )).all() or [(1, 1)]
+            busiest = (await session.execute(
+                select(Student.id).order_by(Student.borrow_count.desc()).limit(1)
+            )).scalar_one()
+            queries = hot_path(rng, students, pairs, busiest)
+
+            sizes_before = await table_sizes(session)
+            rng.seed(args.seed)
+            before = await measure(session, queries, args.repeat)
+
+            print(f"Archiving issues returned more than {args.older_than_days} days ago...")
+            report = await archive_returned_issues(session, args.older_than_days, args.batch_size)
+            rate = report.rows / report.seconds if report.seconds else 0
+            print(f"  {report.rows:,} rows in {report.batches} batches, {report.seconds:.1f} s ({rate:,.0f} rows/s)")
+            await analyze(engine)
+
+            sizes_after = await table_sizes(session)
+            rng.seed(args.seed)
+            after = await measure(session, queries, args.repeat)
+            drift = await reconcile_counters(session, fix=False)
+    finally:
+        await engine.dispose()
+
+    for table in sizes_before:
+        print(f"{table:<22}{sizes_before[table]:>12,} -> {sizes_after[table]:,} rows")
+    print(f"\n{'query':<26}{'before p50':>12}{'p95':>9}{'after p50':>12}{'p95':>9}{'speedup':>9}  (ms)")
+    for name, _ in queries:
+        (b50, b95), (a50, a95) = before[name], after[name]
+        print(f"{name:<26}{b50:>12.2f}{b95:>9.2f}{a50:>12.2f}{a95:>9.2f}{b50 / a50 if a50 else 0:>8.1f}x")
+    drifted = sum(drift[name]["drifted"] for name in ("books", "students", "departments"))
+    print(f"\nBorrow counters after archiving: {drifted} drifted")
+
+if __name__ == "__main__":
+    asyncio.run(main())
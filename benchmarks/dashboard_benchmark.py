@@ -0,0 +1,110 @@
+"""
+Compare building the student portal page from the separate student, history
+and overdue endpoints, called one after another, with one call to
+/students/{id}/dashboard, on a synthetic library. Then fire --concurrency
+dashboards at once, more than the pool holds by default, and report how
+many failed (e.g. timing out on the pool) and how long the burst took.
+
+    python -m benchmarks.dashboard_benchmark --scale 10
+    python -m benchmarks.dashboard_benchmark --scale 1 --pool-size 3 --max-overflow 0 --concurrency 50
+    python -m benchmarks.dashboard_benchmark --database-url mysql+aiomysql://... --scale 100 --keep-data
+"""
+import argparse
+import asyncio
+import math
+import os
+import statistics
+import time
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///dashboard_benchmark.db")
+    parser.add_argument("--scale", type=float, default=10, help="synthetic library scale; 100 is 10M issues")
+    parser.add_argument("--students", type=int, default=50, help="how many of the busiest students to load")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", type=int, default=64, help="dashboards fired at once in the burst")
+    parser.add_argument("--pool-size", type=int, help="override DB_POOL_SIZE")
+    parser.add_argument("--max-overflow", type=int, help="override DB_MAX_OVERFLOW")
+    parser.add_argument("--keep-data", action="store_true", help="reuse the library from a previous run")
+    return parser.parse_args()
+
+def summary(samples) -> str:
+    samples = sorted(samples)
+    p95 = samples[max(0, math.ceil(len(samples) * 0.95) - 1)]
+    return f"p50 {statistics.median(samples):8.2f} ms   p95 {p95:8.2f} ms"
+
+async def main():
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["OVERDUE_SWEEP_INTERVAL"] = "0"
+    if args.pool_size is not None:
+        os.environ["DB_POOL_SIZE"] = str(args.pool_size)
+    if args.max_overflow is not None:
+        os.environ["DB_MAX_OVERFLOW"] = str(args.max_overflow)
+    import httpx
+    from sqlalchemy import select
+    from app.config import settings
+    from app.database import engine, async_session
+    from app.main import app
+    from app.migrations import migrate
+    from app.models.student import Student
+    from app.synthetic_data import SyntheticConfig, generate_library
+    from app.utils import catalog_cache
+
+    await migrate(engine)
+    if not args.keep_data:
+        print(f"Generating a scale {args.scale} library...")
+        await generate_library(engine, SyntheticConfig.scaled(args.scale, seed=args.seed), progress=lambda _: None)
+    async with async_session() as session:
+        ids = (await session.execute(
+            select(Student.id).order_by(Student.borrow_count.desc()).limit(max(args.students, args.concurrency))
+        )).scalars().all()
+    students = ids[:args.students]
+
+    base = "/api/v1/students/students"
+    portal = lambda sid: [
+        f"{base}/{sid}",
+        f"/api/v1/issues/issues/student/{sid}",
+        f"/api/v1/issues/issues/student/{sid}/overdue",
+    ]
+    sequential, dashboard = [], []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm the pool, caches and serializers
+        for url in portal(students[0]) + [f"{base}/{students[0]}/dashboard"]:
+            (await client.get(url)).raise_for_status()
+        for _ in range(args.repeat):
+            for sid in students:
+                start = time.perf_counter()
+                for url in portal(sid):
+                    (await client.get(url)).raise_for_status()
+                sequential.append((time.perf_counter() - start) * 1000)
+
+                start = time.perf_counter()
+                (await client.get(f"{base}/{sid}/dashboard")).raise_for_status()
+                dashboard.append((time.perf_counter() - start) * 1000)
+
+        # Distinct students with a cold catalog cache, so every profile is a query
+        catalog_cache.student_cache.clear()
+        burst = [ids[i % len(ids)] for i in range(args.concurrency)]
+        start = time.perf_counter()
+        # An error inside the app (e.g. a pool timeout) is raised here rather than returned as a 500
+        responses = await asyncio.gather(
+            *(client.get(f"{base}/{sid}/dashboard") for sid in burst), return_exceptions=True
+        )
+        burst_ms = (time.perf_counter() - start) * 1000
+    await engine.dispose()
+
+    print(f"{len(students)} busiest students x {args.repeat}")
+    print(f"  sequential portal calls  {summary(sequential)}")
+    print(f"  dashboard                {summary(dashboard)}")
+    print(f"  speedup (p50)            {statistics.median(sequential) / statistics.median(dashboard):.1f}x")
+    failed = sum(isinstance(response, Exception) or response.status_code != 200 for response in responses)
+    print(f"{args.concurrency} concurrent dashboards, pool {settings.DB_POOL_SIZE} + {settings.DB_MAX_OVERFLOW} overflow")
+    print(f"  {args.concurrency - failed} ok, {failed} failed in {burst_ms:.0f} ms")
+    if failed:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
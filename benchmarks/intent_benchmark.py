@@ -0,0 +1,90 @@
+"""
+Compare the compiled intent matcher with the original substring scan as the
+number of intent phrasings grows. Exits non-zero if the matcher gets any of
+QUESTIONS wrong on the built-in intents.
+
+    python -m benchmarks.intent_benchmark --scales 1 10 100
+"""
+import argparse
+import random
+import statistics
+import time
+from app.routers.conversation import INTENT_PATTERNS
+from app.utils.intents import IntentMatcher
+
+# (question, expected intent on the built-in patterns)
+QUESTIONS = [
+    ("How many books are overdue?", "overdue_books"),
+    ("Which department borrowed the most books?", "department_borrows"),
+    ("Show me the most popular books", "popular_books"),
+    ("Who are the most active students?", "active_students"),
+    ("overdeu books please", "overdue_books"),
+    ("what is the weather like", "unknown"),
+    # "top" carries "top books"; these must not be answered as popular books
+    ("top department", "unknown"),
+    ("top students", "unknown"),
+]
+SYLLABLES = "ka lo mi ren tor vas el un dra pha qui zen bor lin set mur".split()
+TEMPLATES = [
+    "{topic} report for {branch} branch",
+    "how many {topic} at {branch}",
+    "{branch} {topic} statistics",
+    "show {topic} in {branch} library",
+]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+def substring_scan(patterns, question: str) -> str:
+    """The original detect_intent."""
+    question = question.lower().strip()
+    for intent, phrasings in patterns.items():
+        if any(pattern in question for pattern in phrasings):
+            return intent
+    return "unknown"
+
+def scaled_patterns(scale: int, rng: random.Random):
+    """The built-in intents plus synthetic per-branch, per-topic ones, `scale` times as many phrasings."""
+    patterns = {intent: list(phrasings) for intent, phrasings in INTENT_PATTERNS.items()}
+    base = sum(len(phrasings) for phrasings in INTENT_PATTERNS.values())
+    target = base * scale
+    word = lambda: "".join(rng.choices(SYLLABLES, k=rng.randint(2, 3)))
+    while sum(len(phrasings) for phrasings in patterns.values()) < target:
+        branch, topic = word(), word()
+        patterns[f"{branch}_{topic}"] = [t.format(branch=branch, topic=topic) for t in TEMPLATES]
+    return patterns
+
+def per_question_us(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for question, _ in QUESTIONS:
+            fn(question)
+        samples.append((time.perf_counter() - start) / len(QUESTIONS) * 1e6)
+    return statistics.median(samples)
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+    matcher = IntentMatcher(INTENT_PATTERNS)
+    wrong = [(q, expected, matcher.match(q)[0]) for q, expected in QUESTIONS if matcher.match(q)[0] != expected]
+    for question, expected, got in wrong:
+        print(f"MISMATCH {question!r}: expected {expected}, got {got}")
+    print(f"{'phrasings':>10}{'build ms':>10}{'scan us/q':>12}{'matcher us/q':>14}")
+    for scale in args.scales:
+        patterns = scaled_patterns(scale, rng)
+        start = time.perf_counter()
+        matcher = IntentMatcher(patterns)
+        build_ms = (time.perf_counter() - start) * 1000
+        scan = per_question_us(lambda q: substring_scan(patterns, q), args.repeat)
+        compiled = per_question_us(matcher.match, args.repeat)
+        phrasings = sum(len(p) for p in patterns.values())
+        print(f"{phrasings:>10}{build_ms:>10.1f}{scan:>12.1f}{compiled:>14.1f}")
+    raise SystemExit(1 if wrong else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Fire concurrent checkouts of one hot book through the API and check that it
+is never oversold, reporting latency percentiles for POST /issues.
+
+    python -m benchmarks.issue_concurrency --requests 200 --copies 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///issue_concurrency.db")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--copies", type=int, default=50)
+    return parser.parse_args()
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+async def main():
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.database_url
+    import httpx
+    from sqlalchemy import func, select
+    from app.database import Base, engine, async_session
+    from app.main import app
+    from app.models.book import Book
+    from app.models.student import Student
+    from app.models.book_issue import BookIssue
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_session() as session:
+        book = Book(title="Hot Textbook", author="Author", isbn="9999999999", total_copies=args.copies,
+                    available_copies=args.copies, category="Exam")
+        session.add(book)
+        session.add_all(
+            Student(name=f"Student {i}", roll_number=f"BENCH{i:05d}", department="Bench", semester=1,
+                    phone=f"{7000000000 + i}", email=f"bench{i}@example.com")
+            for i in range(args.requests)
+        )
+        await session.commit()
+        book_id = book.id
+        student_ids = (await session.execute(select(Student.id))).scalars().all()
+
+    latencies, statuses = [], {}
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def checkout(student_id: int):
+            payload = {"book_id": book_id, "student_id": student_id,
+                       "issue_date": "2026-01-01T00:00:00", "return_date": "2026-01-15T00:00:00"}
+            start = time.perf_counter()
+            response = await client.post("/api/v1/issues/issues/", json=payload)
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(checkout(student_id) for student_id in student_ids))
+        elapsed = time.perf_counter() - started
+
+    async with async_session() as session:
+        available = (await session.execute(select(Book.available_copies).where(Book.id == book_id))).scalar_one()
+        issued = (await session.execute(select(func.count(BookIssue.id)).where(BookIssue.book_id == book_id))).scalar_one()
+    await engine.dispose()
+
+    print(f"{args.requests} concurrent checkouts of {args.copies} copies in {elapsed:.2f}s")
+    print(f"status codes: {dict(sorted(statuses.items()))}")
+    print(f"issues recorded: {issued}, available_copies left: {available}")
+    print(f"latency ms: p50={statistics.median(latencies):.1f} p95={percentile(latencies, 95):.1f} "
+          f"p99={percentile(latencies, 99):.1f}")
+    oversold = issued > args.copies or available < 0 or issued + available != args.copies
+    print("OVERSOLD" if oversold else "no oversell")
+    raise SystemExit(1 if oversold else 0)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,342 @@
+"""
+Start the app under uvicorn against a freshly generated library, drive a
+mixed workload (catalog search, issue/return, overdue listings, chat) at a
+fixed concurrency, and report throughput and p50/p95/p99 latency per route.
+
+    python -m benchmarks.load_test --scale 1 --concurrency 32 --duration 60 --output before.json
+    python -m benchmarks.load_test --scale 1 --concurrency 32 --duration 60 --compare before.json
+    python -m benchmarks.load_test --url http://staging:8000 --database-url mysql+aiomysql://... --duration 60
+
+Without --url the library in --database-url is wiped and regenerated unless
+--keep-data is given. With --url the server's database is only read, to
+size the workload, unless --regenerate asks for it to be wiped and seeded.
+
+Results are written as JSON. With --compare, routes whose p95 grew by more
+than --max-regression (or whose throughput fell by as much) are listed and
+the exit status is 1.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Operation -> share of the workload
+DEFAULT_MIX = "search=30,list_books=10,issue_return=20,overdue=15,student_issues=10,chat=15"
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="default sqlite+aiosqlite:///load_test.db; "
+                        "with --url, the database that server uses (required)")
+    parser.add_argument("--scale", type=float, default=0.2, help="synthetic library size, as for seed_db.py --scale")
+    parser.add_argument("--keep-data", action="store_true",
+                        help="reuse the existing database instead of regenerating it (the default with --url)")
+    parser.add_argument("--url", help="load an already running server instead of starting one")
+    parser.add_argument("--regenerate", action="store_true",
+                        help="with --url, wipe the server's database and generate the library in it first")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds of load before measuring")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default="load_test.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    args = parser.parse_args()
+    if args.url and not args.database_url:
+        # The workload picks book and student ids from this database
+        parser.error("--url needs --database-url pointing at the server's database")
+    if args.regenerate and not args.url:
+        parser.error("--regenerate only applies with --url; without it the library is regenerated by default")
+    args.database_url = args.database_url or "sqlite+aiosqlite:///load_test.db"
+    return args
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise SystemExit(f"unknown operation {name!r}; choose from {', '.join(OPERATIONS)}")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+class Recorder:
+    """Latencies and status codes per route, from the end of the warmup on."""
+
+    def __init__(self):
+        self.measuring = False
+        self.latencies = {}
+        self.statuses = {}
+        self.errors = {}
+
+    async def request(self, client, route: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            status = response.status_code
+        except Exception:
+            response, status = None, "error"
+        elapsed = (time.perf_counter() - start) * 1000
+        if self.measuring:
+            self.latencies.setdefault(route, []).append(elapsed)
+            counts = self.statuses.setdefault(route, {})
+            counts[str(status)] = counts.get(str(status), 0) + 1
+            if status == "error" or status >= 500:
+                self.errors[route] = self.errors.get(route, 0) + 1
+        return response
+
+    def summary(self, seconds: float) -> dict:
+        routes = {}
+        for route, samples in sorted(self.latencies.items()):
+            routes[route] = {
+                "requests": len(samples),
+                "rps": round(len(samples) / seconds, 2),
+                "p50_ms": round(percentile(samples, 50), 2),
+                "p95_ms": round(percentile(samples, 95), 2),
+                "p99_ms": round(percentile(samples, 99), 2),
+                "max_ms": round(max(samples), 2),
+                "errors": self.errors.get(route, 0),
+                "statuses": self.statuses[route],
+            }
+        every = [sample for samples in self.latencies.values() for sample in samples]
+        total = {
+            "requests": len(every),
+            "rps": round(len(every) / seconds, 2),
+            "p50_ms": round(percentile(every, 50), 2) if every else 0.0,
+            "p95_ms": round(percentile(every, 95), 2) if every else 0.0,
+            "p99_ms": round(percentile(every, 99), 2) if every else 0.0,
+            "errors": sum(route["errors"] for route in routes.values()),
+        }
+        return {"total": total, "routes": routes}
+
+async def search(client, rng, recorder, library):
+    query = rng.choice(library["queries"])
+    await recorder.request(client, "GET /books/search", "GET", "/api/v1/books/books/search", params={"q": query})
+
+async def list_books(client, rng, recorder, library):
+    params = {"limit": 20, "page": rng.randint(1, 5)}
+    await recorder.request(client, "GET /books", "GET", "/api/v1/books/books/", params=params)
+
+async def issue_return(client, rng, recorder, library):
+    issue_date = datetime.now().replace(microsecond=0)
+    payload = {
+        "book_id": rng.randint(1, library["books"]),
+        "student_id": rng.randint(1, library["students"]),
+        "issue_date": issue_date.isoformat(),
+        "return_date": issue_date.replace(year=issue_date.year + 1).isoformat(),
+    }
+    response = await recorder.request(client, "POST /issues", "POST", "/api/v1/issues/issues/", json=payload)
+    if response is not None and response.status_code == 200:
+        issue_id = response.json()["id"]
+        await recorder.request(client, "PUT /issues/{id}/return", "PUT", f"/api/v1/issues/issues/{issue_id}/return")
+
+async def overdue(client, rng, recorder, library):
+    await recorder.request(client, "GET /issues/overdue", "GET", "/api/v1/issues/issues/overdue", params={"limit": 20})
+
+async def student_issues(client, rng, recorder, library):
+    student_id = rng.randint(1, library["students"])
+    await recorder.request(client, "GET /issues/student/{id}", "GET", f"/api/v1/issues/issues/student/{student_id}")
+
+async def chat(client, rng, recorder, library):
+    question = rng.choice(library["questions"])
+    await recorder.request(client, "POST /chat/ask", "POST", "/api/v1/chat/ask", json={"text": question})
+
+OPERATIONS = {
+    "search": search,
+    "list_books": list_books,
+    "issue_return": issue_return,
+    "overdue": overdue,
+    "student_issues": student_issues,
+    "chat": chat,
+}
+
+async def prepare(args) -> dict:
+    """Generate the library (unless --keep-data, or --url without --regenerate)
+    and describe it for the workload."""
+    os.environ["DATABASE_URL"] = args.database_url
+    from sqlalchemy import func, select
+    from sqlalchemy.exc import DBAPIError
+    from app.database import engine
+    from app.migrations import migrate
+    from app.models.book import Book
+    from app.models.student import Student
+    from app.routers.conversation import INTENT_PATTERNS
+    from app.synthetic_data import LAST_NAMES, TITLE_WORDS, SyntheticConfig, generate_library
+
+    # A running server's database is only read unless --regenerate asks otherwise
+    regenerate = args.regenerate if args.url else not args.keep_data
+    try:
+        if regenerate or not args.url:
+            await migrate(engine)
+        if regenerate:
+            print(f"Generating a scale {args.scale} library...")
+            await generate_library(engine, SyntheticConfig.scaled(args.scale, seed=args.seed), progress=lambda _: None)
+        async with engine.connect() as conn:
+            if engine.dialect.name == "sqlite" and not args.url:
+                # Lets the server's readers run alongside its one writer; persists in the file
+                await conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+            books = (await conn.execute(select(func.count(Book.id)))).scalar_one()
+            students = (await conn.execute(select(func.count(Student.id)))).scalar_one()
+    except DBAPIError as exc:
+        raise SystemExit(f"can't read the library from {args.database_url}: {exc.orig}")
+    finally:
+        await engine.dispose()
+    if not books or not students:
+        raise SystemExit(f"{args.database_url} has {books} books and {students} students; "
+                         f"seed it first or {'pass --regenerate' if args.url else 'drop --keep-data'}")
+    return {
+        "books": books,
+        "students": students,
+        "queries": TITLE_WORDS + [name.lower() for name in LAST_NAMES] + ["histroy", "shadow empire", "979000"],
+        "questions": [phrasing for phrasings in INTENT_PATTERNS.values() for phrasing in phrasings],
+    }
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(args, port: int, log):
+    env = dict(os.environ, DATABASE_URL=args.database_url, OVERDUE_SWEEP_INTERVAL="0")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [REPO_ROOT, env.get("PYTHONPATH")]))
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+async def wait_until_ready(client, server, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server is not None and server.poll() is not None:
+            raise SystemExit("server exited during startup; see load_test_server.log")
+        try:
+            if (await client.get("/api/v1/books/books/", params={"limit": 1})).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise SystemExit("server did not become ready")
+
+async def run_load(args, base_url: str, library: dict, server=None) -> dict:
+    import httpx
+
+    weights = parse_mix(args.mix)
+    operations, shares = [OPERATIONS[name] for name in weights], list(weights.values())
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        await wait_until_ready(client, server)
+        stop_at = time.monotonic() + args.warmup + args.duration
+
+        async def worker(number: int):
+            rng = random.Random(f"{args.seed}:{number}")
+            while time.monotonic() < stop_at:
+                await rng.choices(operations, shares)[0](client, rng, recorder, library)
+
+        async def measure():
+            await asyncio.sleep(args.warmup)
+            recorder.measuring = True
+
+        started = time.monotonic()
+        await asyncio.gather(measure(), *(worker(number) for number in range(args.concurrency)))
+    return recorder.summary(time.monotonic() - started - args.warmup)
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def print_summary(results: dict):
+    print(f"{'route':<28}{'requests':>9}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for route, stats in list(results["routes"].items()) + [("TOTAL", results["total"])]:
+        print(f"{route:<28}{stats['requests']:>9}{stats['rps']:>9.1f}{stats['p50_ms']:>9.1f}"
+              f"{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}{stats['errors']:>8}")
+
+def compare(results: dict, baseline: dict, max_regression: float) -> list:
+    """Print p95 and throughput changes per route; return the routes that regressed."""
+    regressions = []
+    print(f"\ncompared with {baseline['meta']['git_commit']} ({baseline['meta']['started_at']}):")
+    changed = [key for key in ("scale", "concurrency", "mix", "workers", "database_url")
+               if baseline["meta"]["args"].get(key) != results["meta"]["args"].get(key)]
+    if changed:
+        print(f"warning: runs differ in {', '.join(changed)}; the numbers are not comparable")
+    print(f"{'route':<28}{'p95 ms':>21}{'rps':>21}")
+    for route, stats in list(results["routes"].items()) + [("TOTAL", results["total"])]:
+        before = baseline["total"] if route == "TOTAL" else baseline["routes"].get(route)
+        if not before:
+            continue
+        p95 = stats["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+        rps = stats["rps"] / before["rps"] - 1 if before["rps"] else 0.0
+        regressed = p95 > max_regression or rps < -max_regression
+        print(f"{route:<28}{before['p95_ms']:>7.1f} -> {stats['p95_ms']:>6.1f} {p95:>+5.0%}"
+              f"{before['rps']:>7.1f} -> {stats['rps']:>6.1f} {rps:>+5.0%}{'  REGRESSED' if regressed else ''}")
+        if regressed:
+            regressions.append(route)
+    return regressions
+
+def main():
+    args = parse_args()
+    parse_mix(args.mix)
+    # Read the baseline up front: --output may name the same file, and a bad
+    # path should fail before the run rather than after it
+    baseline = None
+    if args.compare:
+        with open(args.compare) as stream:
+            baseline = json.load(stream)
+    library = asyncio.run(prepare(args))
+
+    server, log = None, None
+    base_url = args.url
+    if not base_url:
+        port = free_port()
+        log = open("load_test_server.log", "w")
+        server = start_server(args, port, log)
+        base_url = f"http://127.0.0.1:{port}"
+    started_at = datetime.now().isoformat(timespec="seconds")
+    try:
+        print(f"Running {args.concurrency} clients for {args.duration:.0f}s (+{args.warmup:.0f}s warmup) "
+              f"against {base_url}...")
+        results = asyncio.run(run_load(args, base_url, library, server))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+            log.close()
+
+    results["meta"] = {
+        "started_at": started_at,
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "database": args.database_url.split("://")[0],
+        "books": library["books"],
+        "students": library["students"],
+        "args": vars(args),
+    }
+    with open(args.output, "w") as out:
+        json.dump(results, out, indent=2)
+    print_summary(results)
+    print(f"\nresults written to {args.output}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Compare payload size and latency of the issue listings in the full view,
+?view=compact and a ?fields= selection.
+
+    python -m benchmarks.payload_sizes --issues 200000 --limit 100
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from .query_plans import seed
+
+VARIANTS = {
+    "full": "",
+    "compact": "&view=compact",
+    "fields=id,return_date": "&fields=id,return_date",
+    "fields=id,book": "&fields=id,book",
+}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///payload_sizes.db")
+    parser.add_argument("--books", type=int, default=20000)
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--issues", type=int, default=200000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    return parser.parse_args()
+
+async def main():
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.database_url
+    import httpx
+    from app.database import engine
+    from app.main import app
+
+    await seed(args)
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"{'listing':<10}{'variant':<24}{'bytes':>10}{'p50 ms':>9}{'p95 ms':>9}")
+        for listing in ("active", "overdue"):
+            for variant, query in VARIANTS.items():
+                url = f"/api/v1/issues/issues/{listing}?limit={args.limit}{query}"
+                latencies = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    response = await client.get(url)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    response.raise_for_status()
+                latencies.sort()
+                p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+                print(f"{listing:<10}{variant:<24}{len(response.content):>10}"
+                      f"{statistics.median(latencies):>9.2f}{p95:>9.2f}")
+    await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,274 @@
+"""
+Seed a large dataset, drive every router through the API while recording the
+SQL it issues, then EXPLAIN each distinct statement and fail if any of them
+plans a full table scan (other than the few that scan by design).
+
+    python -m benchmarks.query_plans --books 20000 --students 5000 --issues 200000
+
+Works against SQLite (EXPLAIN QUERY PLAN) and MySQL (EXPLAIN).
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+from datetime import datetime, timedelta
+
+# Steps whose statements may scan a whole table, and why
+ALLOWED_SCANS = {
+    "reconcile counters": "recounts the whole issue history by design",
+    "search books": "first search streams the catalog into the in-memory index",
+    "search students": "first search streams the roster into the in-memory index",
+    # The listing filters are substring matches (ILIKE '%...%'), which no
+    # B-tree index can serve; /search is the indexed way to find a book
+    "list books by title": "substring filter, no index can serve it",
+    "list books by author": "substring filter, no index can serve it",
+    "list books by category": "substring filter, no index can serve it",
+    "list students by dept": "substring filter, no index can serve it",
+    "list students search": "substring filter, no index can serve it",
+    "list students by sem": "eight semesters; an index is no more selective than walking by id",
+}
+# Lookup tables small enough that a scan is the right plan
+SMALL_TABLES = {"department_borrow_counts"}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///query_plans.db")
+    parser.add_argument("--books", type=int, default=20000)
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--issues", type=int, default=200000)
+    parser.add_argument("--verbose", action="store_true", help="print the plan of every statement")
+    return parser.parse_args()
+
+async def seed(args):
+    from sqlalchemy import insert
+    from app.database import Base, engine
+    from app.models.book import Book
+    from app.models.student import Student
+    from app.models.book_issue import BookIssue, IssueStatus
+
+    rng = random.Random(13)
+    now = datetime.now()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(Book), [
+            {"title": f"Book {i}", "author": f"Author {i % 500}", "isbn": f"{9780000000000 + i}",
+             "total_copies": 5, "available_copies": 5, "category": f"Category {i % 40}",
+             "created_at": now - timedelta(days=rng.randint(0, 720))}
+            for i in range(args.books)
+        ])
+        await conn.execute(insert(Student), [
+            {"name": f"Student {i}", "roll_number": f"R{i:07d}", "department": f"Dept {i % 25}",
+             "semester": i % 8 + 1, "phone": f"{7000000000 + i}", "email": f"student{i}@example.com"}
+            for i in range(args.students)
+        ])
+        statuses = [IssueStatus.RETURNED] * 17 + [IssueStatus.ISSUED, IssueStatus.OVERDUE, IssueStatus.ISSUED]
+        for start in range(0, args.issues, 10000):
+            rows = []
+            for _ in range(start, min(start + 10000, args.issues)):
+                issued = now - timedelta(days=rng.randint(0, 720))
+                rows.append({"book_id": rng.randint(1, args.books), "student_id": rng.randint(1, args.students),
+                             "issue_date": issued, "return_date": issued + timedelta(days=14),
+                             "status": rng.choice(statuses), "created_at": issued})
+            await conn.execute(insert(BookIssue), rows)
+        if engine.dialect.name == "sqlite":
+            await conn.exec_driver_sql("ANALYZE")
+        else:
+            for table in Base.metadata.sorted_tables:
+                await conn.exec_driver_sql(f"ANALYZE TABLE {table.name}")
+
+def scenario(args):
+    from app.routers.conversation import INTENT_PATTERNS
+
+    book, student = args.books // 2, args.students // 2
+    steps = [
+        ("list books", "GET", "/api/v1/books/books/?limit=20", None),
+        ("list books by title", "GET", "/api/v1/books/books/?title=Book+42&limit=20", None),
+        ("list books by author", "GET", "/api/v1/books/books/?author=Author+42&limit=20", None),
+        ("list books by category", "GET", "/api/v1/books/books/?category=Category+7&limit=20", None),
+        ("list books next page", "GET", "/api/v1/books/books/?limit=20&after={books_cursor}", None),
+        ("get book", "GET", f"/api/v1/books/books/{book}", None),
+        ("search books", "GET", "/api/v1/books/books/search?q=Author+42", None),
+        ("search books by isbn", "GET", f"/api/v1/books/books/search?q={9780000000000 + book}", None),
+        ("update book", "PUT", f"/api/v1/books/books/{book}", {"total_copies": 6}),
+        ("create book", "POST", "/api/v1/books/books/", {
+            "title": "Plan Check", "author": "Someone", "isbn": "9791111111111", "total_copies": 1,
+            "category": "Test"}),
+        ("list students", "GET", "/api/v1/students/students/?limit=20", None),
+        ("list students by dept", "GET", "/api/v1/students/students/?department=Dept+7&limit=20", None),
+        ("list students by sem", "GET", "/api/v1/students/students/?semester=3&limit=20", None),
+        ("list students search", "GET", "/api/v1/students/students/?search=R00042&limit=20", None),
+        ("get student", "GET", f"/api/v1/students/students/{student}", None),
+        ("search students", "GET", "/api/v1/students/students/search?q=Dept+7", None),
+        ("update student", "PUT", f"/api/v1/students/students/{student}", {"department": "Dept 3"}),
+        ("create student", "POST", "/api/v1/students/students/", {
+            "name": "Plan Check", "roll_number": "PLAN0001", "department": "Dept 1", "semester": 1,
+            "phone": "6999999999", "email": "plan@example.com"}),
+        ("issue book", "POST", "/api/v1/issues/issues/", {
+            "book_id": book, "student_id": student,
+            "issue_date": "2026-01-01T00:00:00", "return_date": "2026-01-15T00:00:00"}),
+        ("batch issue", "POST", "/api/v1/issues/issues/batch", {"items": [
+            {"book_id": book + i, "student_id": student + i,
+             "issue_date": "2026-01-01T00:00:00", "return_date": "2026-01-15T00:00:00"} for i in range(1, 4)]}),
+        ("active issues", "GET", "/api/v1/issues/issues/active?limit=20", None),
+        ("overdue issues", "GET", "/api/v1/issues/issues/overdue?limit=20", None),
+        ("student issues", "GET", f"/api/v1/issues/issues/student/{student}", None),
+        ("student history", "GET", f"/api/v1/issues/issues/student/{student}?include_archived=true", None),
+        ("student overdue", "GET", f"/api/v1/issues/issues/student/{student}/overdue", None),
+        ("return book", "PUT", "/api/v1/issues/issues/{issue_id}/return", None),
+        ("batch return", "PUT", "/api/v1/issues/issues/batch/return", None),
+        ("delete student", "DELETE", "/api/v1/students/students/{new_student}", None),
+        ("delete book", "DELETE", "/api/v1/books/books/{new_book}", None),
+        ("reconcile counters", "POST", "/api/v1/internal/counters/reconcile?fix=false", None),
+    ]
+    for intent, phrasings in INTENT_PATTERNS.items():
+        steps.append((f"chat {intent}", "POST", "/api/v1/chat/ask", {"text": phrasings[0]}))
+    return steps
+
+def where_columns(statement: str, table: str) -> set:
+    """Columns of `table` (or its alias) referenced in the statement's WHERE clauses."""
+    columns = set()
+    for clause in re.findall(r"\bWHERE\b(.*?)(?=\bORDER BY\b|\bGROUP BY\b|\bHAVING\b|\bLIMIT\b|$)",
+                             statement, re.IGNORECASE | re.DOTALL):
+        columns.update(re.findall(rf"\b{re.escape(table)}\.(\w+)", clause))
+    return columns
+
+async def index_columns(conn, dialect: str) -> dict:
+    """{(table, index name): columns} for every index, the primary key included
+    (under None on SQLite, where walking the table walks the rowid). Secondary
+    indexes carry the primary key on both SQLite and InnoDB, so it is added to
+    each of them."""
+    from sqlalchemy import inspect
+
+    def primary_keys(sync_conn):
+        inspector = inspect(sync_conn)
+        return {(table, None): set(inspector.get_pk_constraint(table)["constrained_columns"])
+                for table in inspector.get_table_names()}
+
+    if dialect == "sqlite":
+        indexes = await conn.run_sync(primary_keys)
+        rows = (await conn.exec_driver_sql(
+            "SELECT tbl_name, name FROM sqlite_master WHERE type = 'index'"
+        )).all()
+        for table, name in rows:
+            info = (await conn.exec_driver_sql(f'PRAGMA index_info("{name}")')).mappings().all()
+            indexes[(table, name)] = {row["name"] for row in info} | indexes.get((table, None), set())
+        return indexes
+    indexes = {}
+    rows = (await conn.exec_driver_sql(
+        "SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE()"
+    )).all()
+    for table, name, column in rows:
+        indexes.setdefault((table, name), set()).add(column)
+    for (table, name), columns in indexes.items():
+        columns |= indexes.get((table, "PRIMARY"), set())
+    return indexes
+
+def full_scans(dialect: str, statement: str, plan, indexes: dict) -> list:
+    """Tables a plan reads in full, from EXPLAIN (QUERY PLAN) rows.
+
+    Walking a table or index in ORDER BY order under a LIMIT (the paginated
+    listings) stops early, so it is let through when nothing needs sorting
+    afterwards and the index walked holds every column the WHERE clause
+    filters that table on. A filter the index can't check means reading
+    rows until enough of them match, which for a selective filter is the
+    whole table.
+    """
+    limited = re.search(r"\bLIMIT\b", statement, re.IGNORECASE) is not None
+
+    def stops_early(table: str, alias: str, index) -> bool:
+        return limited and where_columns(statement, alias) <= indexes.get((table, index), set())
+
+    scans = []
+    if dialect == "sqlite":
+        sorted_after = any(row["detail"].startswith("USE TEMP B-TREE") for row in plan)
+        for row in plan:
+            match = re.match(r"SCAN (?:TABLE )?(\w+)(?: AS (\w+))?(?: USING (COVERING )?INDEX (\w+))?", row["detail"])
+            if not match:
+                continue
+            table, alias, covering, index = match.groups()
+            if covering or (not sorted_after and stops_early(table, alias or table, index)):
+                continue
+            scans.append(alias or table)
+        return scans
+    for row in plan:
+        if row["table"] is None or row["table"].startswith("<") or row["type"] not in ("ALL", "index"):
+            continue
+        table = row["table"]
+        index = row["key"] if row["type"] == "index" else "PRIMARY"
+        if "filesort" not in (row["Extra"] or "") and stops_early(table, table, index):
+            continue
+        scans.append(table)
+    return scans
+
+async def main():
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.database_url
+    import httpx
+    from sqlalchemy import event
+    from app.database import engine
+    from app.main import app
+
+    await seed(args)
+    dialect = engine.dialect.name
+
+    captured, current = {}, {"step": None}
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if current["step"] and not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            captured.setdefault(statement, (current["step"], parameters))
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    context = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, method, url, payload in scenario(args):
+            if name == "batch return":
+                payload = {"issue_ids": context["batch_ids"]}
+            current["step"] = name
+            response = await client.request(method, url.format(**context), json=payload)
+            current["step"] = None
+            if response.status_code >= 400:
+                await engine.dispose()
+                raise SystemExit(f"{name}: HTTP {response.status_code} {response.text[:200]}")
+            if name == "list books":
+                context["books_cursor"] = response.headers["X-Next-Cursor"]
+            elif name == "issue book":
+                context["issue_id"] = response.json()["id"]
+            elif name == "batch issue":
+                context["batch_ids"] = [issue["id"] for issue in response.json()["succeeded"]]
+            elif name == "create student":
+                context["new_student"] = response.json()["id"]
+            elif name == "create book":
+                context["new_book"] = response.json()["id"]
+
+    failures = allowed_scans = 0
+    explain = "EXPLAIN QUERY PLAN " if dialect == "sqlite" else "EXPLAIN "
+    async with engine.connect() as conn:
+        indexes = await index_columns(conn, dialect)
+        for statement, (step, parameters) in captured.items():
+            result = await conn.exec_driver_sql(explain + statement, parameters)
+            plan = result.mappings().all()
+            scans = [table for table in full_scans(dialect, statement, plan, indexes) if table not in SMALL_TABLES]
+            allowed = ALLOWED_SCANS.get(step)
+            status = "ok"
+            if scans:
+                status = f"scan of {', '.join(scans)} (allowed: {allowed})" if allowed else f"FULL SCAN of {', '.join(scans)}"
+                failures += not allowed
+                allowed_scans += bool(allowed)
+            print(f"{step:<24}{status}")
+            if args.verbose or (scans and not allowed):
+                print("    " + " ".join(statement.split())[:300])
+                for row in plan:
+                    print("      " + (row["detail"] if dialect == "sqlite" else str(dict(row))))
+        await conn.rollback()
+    await engine.dispose()
+
+    print(f"{len(captured)} distinct statements explained, {failures} full scans "
+          f"({allowed_scans} more in steps that scan by design)")
+    raise SystemExit(1 if failures else 0)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+"""
+Compare catalog search paths: the ILIKE '%term%' filter used by list_books,
+the in-process trigram index, and (on MySQL) the FULLTEXT index.
+
+    python -m benchmarks.search_benchmark --books 500000
+    python -m benchmarks.search_benchmark --database-url mysql+aiomysql://... --books 500000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+WORDS = (
+    "history science shadow river empire garden silent machine winter ocean "
+    "ancient modern theory practice journey kingdom secret light dark stone "
+    "algebra physics biology chemistry poetry letters war peace city island"
+).split()
+SURNAMES = "smith johnson brown davis wilson tolkien austen orwell herbert lee".split()
+CATEGORIES = ["Fiction", "Science", "History", "Fantasy", "Engineering", "Romance"]
+QUERIES = ["shadow empire", "physics", "tolkien", "ancient garden", "histroy", "winter ocean"]
+SYLLABLES = "ka lo mi ren tor vas el un dra pha qui zen bor lin set mur".split()
+
+def vocabulary(rng: random.Random, size: int = 20_000):
+    """Real words plus pseudo-words, weighted by a Zipf-like popularity curve."""
+    words = list(WORDS)
+    while len(words) < size:
+        words.append("".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    rng.shuffle(weights)
+    return words, weights
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///search_benchmark.db")
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+async def populate(session, count: int, seed: int):
+    from sqlalchemy import func, insert, select
+    from app.models.book import Book
+
+    existing = (await session.execute(select(func.count(Book.id)))).scalar_one()
+    if existing >= count:
+        return
+    rng = random.Random(seed)
+    words, weights = vocabulary(rng)
+    batch = []
+    for i in range(existing, count):
+        batch.append({
+            "title": " ".join(rng.choices(words, weights, k=rng.randint(2, 5))).title(),
+            "author": f"{rng.choice(words).title()} {rng.choice(SURNAMES).title()}",
+            "isbn": f"{9780000000000 + i}",
+            "total_copies": 1,
+            "available_copies": 1,
+            "category": rng.choice(CATEGORIES),
+        })
+        if len(batch) == 5000:
+            await session.execute(insert(Book), batch)
+            batch = []
+    if batch:
+        await session.execute(insert(Book), batch)
+    await session.commit()
+
+async def timed(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+async def main():
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.database_url
+    from sqlalchemy import select
+    from app.database import Base, engine, async_session
+    from app.models.book import Book
+    from app.utils import search
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_session() as session:
+        print(f"Populating {args.books} books...")
+        await populate(session, args.books, args.seed)
+
+        start = time.perf_counter()
+        await search._ensure_loaded(search.book_index, session, [Book.id, Book.title, Book.author, Book.category])
+        print(f"In-process index built in {time.perf_counter() - start:.2f}s ({len(search.book_index)} docs)")
+
+        fulltext = session.get_bind().dialect.name == "mysql"
+        print(f"{'query':<16}{'ilike ms':>12}{'index ms':>12}{'fulltext ms':>14}")
+        for q in QUERIES:
+            async def ilike():
+                # What list_books does today: leading-wildcard ILIKE, ordered by id
+                term = q.split()[0]
+                await session.execute(
+                    select(Book).where(Book.title.ilike(f"%{term}%")).order_by(Book.id).limit(10)
+                )
+
+            async def indexed():
+                search.settings.SEARCH_BACKEND = "index"
+                await search.search_books(session, q, 10)
+
+            async def full():
+                search.settings.SEARCH_BACKEND = "fulltext"
+                await search.search_books(session, q, 10)
+
+            row = f"{q:<16}{await timed(ilike, args.repeat):>12.2f}{await timed(indexed, args.repeat):>12.2f}"
+            row += f"{await timed(full, args.repeat):>14.2f}" if fulltext else f"{'n/a':>14}"
+            print(row)
+    await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""
+Compare the response_model path with FAST_RESPONSES on the list endpoints,
+checking that both produce identical bytes, and time encoding 100 nested
+issues on its own.
+
+    python -m benchmarks.serialization_benchmark --limit 100
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from .query_plans import seed
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///serialization_benchmark.db")
+    parser.add_argument("--books", type=int, default=20000)
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--issues", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    return parser.parse_args()
+
+def time_call(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+async def main():
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.database_url
+    import httpx
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from sqlalchemy import select
+    from sqlalchemy.orm import selectinload
+    from app.config import settings
+    from app.database import engine, async_session
+    from app.main import app
+    from app.models.book_issue import BookIssue
+    from app.schemas.book_issue import BookIssueResponse
+    from app.utils.serialization import FastJSONResponse, serializer_for
+
+    await seed(args)
+    endpoints = [
+        f"/api/v1/books/books/?limit={args.limit}",
+        f"/api/v1/students/students/?limit={args.limit}",
+        f"/api/v1/issues/issues/active?limit={args.limit}",
+        f"/api/v1/issues/issues/overdue?limit={args.limit}",
+        f"/api/v1/issues/issues/student/{args.students // 2}",
+    ]
+    mismatches = 0
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"{'endpoint':<44}{'bytes':>8}{'model ms':>10}{'fast ms':>9}  same bytes")
+        for url in endpoints:
+            timings, bodies = {}, {}
+            for fast in (False, True):
+                settings.FAST_RESPONSES = fast
+                samples = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    response = await client.get(url)
+                    samples.append((time.perf_counter() - start) * 1000)
+                    response.raise_for_status()
+                timings[fast] = statistics.median(samples)
+                bodies[fast] = (response.content, response.headers.get("x-next-cursor"))
+            same = bodies[False] == bodies[True]
+            mismatches += not same
+            print(f"{url.split('?')[0]:<44}{len(bodies[True][0]):>8}{timings[False]:>10.2f}{timings[True]:>9.2f}  {same}")
+
+    async with async_session() as session:
+        result = await session.execute(
+            select(BookIssue).options(selectinload(BookIssue.book), selectinload(BookIssue.student)).limit(args.limit)
+        )
+        issues = result.scalars().all()
+    serializer = serializer_for(BookIssueResponse)
+    model_ms = time_call(lambda: JSONResponse(jsonable_encoder(
+        [BookIssueResponse.model_validate(issue).model_dump(mode="json") for issue in issues])), args.repeat)
+    fast_ms = time_call(lambda: FastJSONResponse([serializer.serialize(issue) for issue in issues]), args.repeat)
+    print(f"encode {len(issues)} nested issues: response_model path {model_ms:.2f} ms, fast path {fast_ms:.2f} ms")
+    await engine.dispose()
+    raise SystemExit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+"""
+Report import time and time-to-first-request of fresh worker processes,
+booting the old way (create_all on startup, cold pool) and the new way
+(schema version check, warmed pool).
+
+    python -m benchmarks.startup_benchmark --runs 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Runs in each fresh interpreter; prints timings as JSON
+WORKER = r"""
+import asyncio, json, os, time
+import httpx  # the client is not part of the app's import cost
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+async def boot():
+    from app.database import Base, engine
+    if os.environ["BENCH_MODE"] == "create_all":
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    await app.router.startup()
+    booted = time.perf_counter()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        (await client.get("/api/v1/books/books/?limit=10")).raise_for_status()
+    answered = time.perf_counter()
+    await app.router.shutdown()
+    return booted, answered
+
+booted, answered = asyncio.run(boot())
+print(json.dumps({"import": imported - started, "startup": booted - imported, "first_request": answered - booted}))
+"""
+
+MODES = {
+    "create_all": {"DB_SCHEMA_ON_STARTUP": "skip", "DB_POOL_WARMUP": "0"},
+    "check": {"DB_SCHEMA_ON_STARTUP": "check"},
+}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///startup_benchmark.db")
+    parser.add_argument("--runs", type=int, default=5)
+    return parser.parse_args()
+
+def run_worker(mode: str, database_url: str) -> dict:
+    env = dict(os.environ, DATABASE_URL=database_url, BENCH_MODE=mode, OVERDUE_SWEEP_INTERVAL="0", **MODES[mode])
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [repo_root, env.get("PYTHONPATH")]))
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", WORKER], env=env, check=True, capture_output=True, text=True).stdout
+    timings = json.loads(output.strip().splitlines()[-1])
+    timings["process_to_first_response"] = time.perf_counter() - start
+    return timings
+
+async def prepare(database_url: str):
+    os.environ["DATABASE_URL"] = database_url
+    from app.database import engine
+    from app.migrations import migrate
+    await migrate(engine)
+    await engine.dispose()
+
+def main():
+    args = parse_args()
+    asyncio.run(prepare(args.database_url))
+    print(f"{'mode':<12}{'import ms':>11}{'startup ms':>12}{'1st req ms':>12}{'process->1st ms':>17}")
+    for mode in MODES:
+        runs = [run_worker(mode, args.database_url) for _ in range(args.runs)]
+        median = {key: statistics.median(run[key] for run in runs) * 1000 for key in runs[0]}
+        print(f"{mode:<12}{median['import']:>11.1f}{median['startup']:>12.1f}{median['first_request']:>12.1f}"
+              f"{median['process_to_first_response']:>17.1f}")
+
+if __name__ == "__main__":
+    main()
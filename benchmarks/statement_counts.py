@@ -0,0 +1,93 @@
+"""
+Count the SQL statements and commits each write endpoint issues, and fail if
+any endpoint goes over its budget (for example by refreshing after commit or
+lazy-loading a relationship).
+
+    python -m benchmarks.statement_counts
+"""
+import argparse
+import asyncio
+import os
+
+# endpoint -> (max statements, commits)
+BUDGETS = {
+    "create_book": (2, 1),
+    "update_book": (2, 1),
+    "create_student": (2, 1),
+    "update_student": (3, 1),
+    "issue_book": (6, 1),
+    "return_book": (4, 1),
+    "delete_student": (2, 1),
+    "delete_book": (2, 1),
+}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///statement_counts.db")
+    return parser.parse_args()
+
+async def main():
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.database_url
+    import httpx
+    from sqlalchemy import event
+    from app.database import Base, engine
+    from app.main import app
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    counts = {"statements": 0, "commits": 0}
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_statement(*_):
+        counts["statements"] += 1
+
+    @event.listens_for(engine.sync_engine, "commit")
+    def count_commit(*_):
+        counts["commits"] += 1
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def measure(name, method, url, **kwargs):
+            counts.update(statements=0, commits=0)
+            response = await client.request(method, url, **kwargs)
+            response.raise_for_status()
+            return name, counts["statements"], counts["commits"]
+
+        results = [
+            await measure("create_book", "POST", "/api/v1/books/books/", json={
+                "title": "Dune", "author": "Frank Herbert", "isbn": "9780441013593",
+                "total_copies": 3, "category": "Science Fiction"}),
+            await measure("update_book", "PUT", "/api/v1/books/books/1", json={"total_copies": 4}),
+            await measure("create_student", "POST", "/api/v1/students/students/", json={
+                "name": "Ada", "roll_number": "CS001", "department": "CS", "semester": 1,
+                "phone": "9000000001", "email": "ada@example.com"}),
+            await measure("update_student", "PUT", "/api/v1/students/students/1", json={"phone": "9000000002"}),
+            await measure("issue_book", "POST", "/api/v1/issues/issues/", json={
+                "book_id": 1, "student_id": 1,
+                "issue_date": "2026-01-01T00:00:00", "return_date": "2026-01-15T00:00:00"}),
+            await measure("return_book", "PUT", "/api/v1/issues/issues/1/return"),
+        ]
+        await client.post("/api/v1/students/students/", json={
+            "name": "Bob", "roll_number": "CS002", "department": "CS", "semester": 1,
+            "phone": "9000000003", "email": "bob@example.com"})
+        await client.post("/api/v1/books/books/", json={
+            "title": "Emma", "author": "Jane Austen", "isbn": "9780141439587",
+            "total_copies": 1, "category": "Fiction"})
+        results.append(await measure("delete_student", "DELETE", "/api/v1/students/students/2"))
+        results.append(await measure("delete_book", "DELETE", "/api/v1/books/books/2"))
+    await engine.dispose()
+
+    failed = False
+    print(f"{'endpoint':<16}{'statements':>12}{'commits':>9}  budget")
+    for name, statements, commits in results:
+        max_statements, expected_commits = BUDGETS[name]
+        ok = statements <= max_statements and commits == expected_commits
+        failed |= not ok
+        print(f"{name:<16}{statements:>12}{commits:>9}  {max_statements}/{expected_commits}{'' if ok else '  OVER BUDGET'}")
+    raise SystemExit(1 if failed else 0)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,25 @@
+import argparse
+import asyncio
+from app.database import async_session, engine
+from app.book_import import import_books, detect_format, IMPORT_FORMATS
+
+async def run(path: str, fmt: str, batch_size: int):
+    try:
+        async with async_session() as session:
+            with open(path, "rb") as stream:
+                return await import_books(session, stream, fmt, batch_size)
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import books from a CSV or NDJSON file")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=IMPORT_FORMATS)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"Importing books from {args.path}...")
+    report = asyncio.run(run(args.path, args.format or detect_format(args.path), args.batch_size))
+    for error in report.errors:
+        print(f"  row {error.row} ({error.isbn or '-'}): {error.error}")
+    print(f"Import completed: {report.processed} rows, {report.inserted} inserted, {len(report.errors)} errors")
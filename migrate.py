@@ -0,0 +1,22 @@
+import argparse
+import asyncio
+from app.database import engine
+from app.migrations import SCHEMA_VERSION, get_schema_version, migrate
+
+async def run(check: bool) -> int:
+    try:
+        if check:
+            version = await get_schema_version(engine)
+            print(f"Schema version {version}, app expects {SCHEMA_VERSION}")
+            return 0 if version >= SCHEMA_VERSION else 1
+        old, new = await migrate(engine)
+        print(f"Schema migrated from version {old} to {new}" if new != old else f"Schema already at version {new}")
+        return 0
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create or upgrade the database schema")
+    parser.add_argument("--check", action="store_true", help="only report whether migrations are pending")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(run(args.check)))
@@ -0,0 +1,24 @@
+import argparse
+import asyncio
+from app.database import async_session, engine
+from app.utils.counters import reconcile_counters
+
+async def run(fix: bool):
+    try:
+        async with async_session() as session:
+            return await reconcile_counters(session, fix)
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild borrow counters from the issue history")
+    parser.add_argument("--dry-run", action="store_true", help="only report drift")
+    args = parser.parse_args()
+
+    print("Reconciling borrow counters...")
+    report = asyncio.run(run(fix=not args.dry_run))
+    for name in ("books", "students", "departments"):
+        print(f"  {name}: {report[name]['drifted']} drifted")
+        for example in report[name]["examples"]:
+            print(f"    {example}")
+    print("Counters rebuilt!" if report["fixed"] else "Dry run, nothing changed.")
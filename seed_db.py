@@ -1,7 +1,47 @@
+import argparse
 import asyncio
+from datetime import datetime
+from app.database import engine
+from app.migrations import migrate
 from app.seed_data import seed_database
+from app.synthetic_data import SyntheticConfig, generate_library
+
+async def main(config: SyntheticConfig = None, resume: bool = False):
+    try:
+        await migrate(engine)
+        if config is None:
+            await seed_database()
+            return
+        reports = await generate_library(engine, config, resume)
+        for report in reports:
+            skipped = f" ({report.skipped:,} already there)" if report.skipped else ""
+            print(f"  {report.table}: {report.rows:,} rows in {report.seconds:.1f}s, "
+                  f"{report.rows_per_second:,.0f} rows/s{skipped}")
+    finally:
+        await engine.dispose()
 
 if __name__ == "__main__":
-    print("Starting database seeding...")
-    asyncio.run(seed_database())
-    print("Database seeding completed!") 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Load sample data, or a synthetic library with --scale")
+    parser.add_argument("--scale", type=float, help="synthetic data size; 1 = 5k books, 500 students, 100k issues")
+    parser.add_argument("--books", type=int, help="override the scaled number of books")
+    parser.add_argument("--students", type=int, help="override the scaled number of students")
+    parser.add_argument("--issues", type=int, help="override the scaled number of issues")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--as-of", type=datetime.fromisoformat,
+                        help="date the history ends on (default today); pass the same value when resuming")
+    parser.add_argument("--resume", action="store_true", help="keep rows from an interrupted run and continue")
+    args = parser.parse_args()
+
+    config = None
+    if args.scale is not None or args.books or args.students or args.issues:
+        config = SyntheticConfig.scaled(args.scale or 1, seed=args.seed, batch_size=args.batch_size, as_of=args.as_of)
+        for name in ("books", "students", "issues"):
+            if getattr(args, name) is not None:
+                setattr(config, name, getattr(args, name))
+        print(f"Generating {config.books:,} books, {config.students:,} students and {config.issues:,} issues "
+              f"(seed {config.seed})...")
+    else:
+        print("Starting database seeding...")
+    asyncio.run(main(config, args.resume))
+    print("Database seeding completed!")
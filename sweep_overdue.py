@@ -0,0 +1,20 @@
+import argparse
+import asyncio
+from app.database import async_session, engine
+from app.overdue_sweeper import sweep_overdue, sweep_stats
+
+async def run(batch_size: int):
+    try:
+        async with async_session() as session:
+            return await sweep_overdue(session, batch_size)
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mark issued books past their return date as overdue")
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+
+    print("Sweeping overdue issues...")
+    rows = asyncio.run(run(args.batch_size))
+    print(f"Marked {rows} issues overdue in {sweep_stats.last_duration_ms} ms")
@@ -0,0 +1,29 @@
+import argparse
+import asyncio
+from app.database import async_session, engine
+from app.book_import import detect_format, IMPORT_FORMATS
+from app.roster_sync import sync_roster
+
+async def run(path: str, fmt: str, batch_size: int, dry_run: bool):
+    try:
+        async with async_session() as session:
+            with open(path, "rb") as stream:
+                return await sync_roster(session, stream, fmt, batch_size, dry_run)
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync students with the semester roster (CSV or NDJSON)")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=IMPORT_FORMATS)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="only report what would change")
+    args = parser.parse_args()
+
+    print(f"Syncing roster from {args.path}...")
+    report = asyncio.run(run(args.path, args.format or detect_format(args.path), args.batch_size, args.dry_run))
+    for error in report.errors:
+        print(f"  row {error.row} ({error.roll_number or '-'}): {error.error}")
+    print(f"Sync {'dry run ' if report.dry_run else ''}completed: {report.processed} rows, {report.inserted} inserted, "
+          f"{report.updated} updated, {report.unchanged} unchanged, {len(report.errors)} errors, "
+          f"{report.not_in_roster} students not in the roster")